@@ -1,8 +1,21 @@
 import os
+import re
 import sys
 from datetime import datetime, timedelta
+from functools import lru_cache
 from pathlib import Path
 
+# Anything other than word characters, spaces and hyphens is dropped from
+# file and folder names (\w already covers alphanumerics and underscores)
+_SANITIZE_RE = re.compile(r'[^\w \-]')
+
+
+@lru_cache(maxsize=512)
+def _sanitize(title, limit):
+    """Strip unsafe characters from a title and truncate it to limit"""
+    return _SANITIZE_RE.sub('', title).strip()[:limit]
+
+
 class Config:
     # Base directory - use environment variable if available
     APP_ROOT = os.environ.get('APP_ROOT', os.path.dirname(os.path.abspath(__file__)))
@@ -27,6 +40,12 @@ class Config:
     MAX_IMAGE_WIDTH = int(os.getenv('MAX_IMAGE_WIDTH', '400'))  # pixels
     PDF_FONT_SIZE = int(os.getenv('PDF_FONT_SIZE', '13'))  # base font size
     
+    # Worker processes used to render PDFs (1 renders in-process)
+    PDF_WORKERS = max(1, int(os.getenv('PDF_WORKERS', str(os.cpu_count() or 1))))
+    # Directory where WeasyPrint caches article images between runs
+    # (empty keeps the cache in memory for the current run only)
+    IMAGE_CACHE_DIR = os.getenv('IMAGE_CACHE_DIR') or ''
+    
     # Template settings with absolute paths
     TEMPLATE_DIR = os.getenv('TEMPLATE_DIR', os.path.join(APP_ROOT, 'templates'))
     TEMPLATE_FILE = os.getenv('TEMPLATE_FILE') or ''  # Empty means use article.html from TEMPLATE_DIR
@@ -38,47 +57,68 @@ class Config:
     
     # Request settings
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '30'))
+    # Tries per feed when the request fails or the server returns a 5xx
+    FETCH_ATTEMPTS = max(1, int(os.getenv('FETCH_ATTEMPTS', '3')))
     USER_AGENT = 'atom2remarkable/1.0 (Feed to PDF Converter)'
+    # ETag/Last-Modified cache for conditional requests
+    HTTP_CACHE_FILE = os.getenv('HTTP_CACHE_FILE') or ''  # Empty means LOG_DIR/http_cache.json
+    MAX_FEED_BYTES = int(os.getenv('MAX_FEED_BYTES', str(16 * 1024 * 1024)))
+    # Feeds larger than this are parsed incrementally with lxml
+    STREAMING_PARSE_BYTES = int(os.getenv('STREAMING_PARSE_BYTES', str(2 * 1024 * 1024)))
+    
+    # Number of feeds fetched and processed concurrently
+    FEED_WORKERS = max(1, int(os.getenv('FEED_WORKERS', '16')))
     
     # reMarkable Cloud settings (core functionality)
     # Folder name in reMarkable
     REMARKABLE_FOLDER = os.getenv('REMARKABLE_FOLDER', 'AtomFeeds')
     RMAPI_PATH = os.getenv('RMAPI_PATH', 'rmapi')  # Path to rmapi binary
+    # Number of rmapi uploads run at the same time
+    UPLOAD_CONCURRENCY = max(1, int(os.getenv('UPLOAD_CONCURRENCY', '4')))
+    # Tries per upload when rmapi hits a transient network error
+    UPLOAD_ATTEMPTS = max(1, int(os.getenv('UPLOAD_ATTEMPTS', '3')))
+    
+    # Reference time pinned by freeze_cutoff() for the length of a run
+    _frozen_now = None
+    
+    @staticmethod
+    def freeze_cutoff(now=None):
+        """Pin the time get_cutoff_time counts back from, and return it"""
+        Config._frozen_now = now or datetime.now()
+        return Config._frozen_now
+    
+    @staticmethod
+    def unfreeze_cutoff():
+        """Make get_cutoff_time follow the clock again"""
+        Config._frozen_now = None
     
     @staticmethod
     def get_cutoff_time():
         """Get the cutoff time for recent entries (24 hours ago)"""
-        return datetime.now() - timedelta(hours=Config.RECENT_HOURS)
+        now = Config._frozen_now or datetime.now()
+        return now - timedelta(hours=Config.RECENT_HOURS)
     
     @staticmethod
     def get_output_filename(entry_title, feed_title, published_date):
         """Generate a safe filename for the PDF output"""
-        # Format the published date as MM-DD-YYYY
-        date_str = published_date.strftime('%m-%d-%Y')
-        
         # Clean the entry title for use as filename
-        safe_entry_title = "".join(
-            c for c in entry_title 
-            if c.isalnum() or c in (' ', '-', '_')
-        ).strip()
         # Keep spaces instead of replacing with underscores 
         # for reMarkable compatibility
-        safe_entry_title = safe_entry_title[:60]  # Reduced to make room for date
+        safe_entry_title = _sanitize(entry_title, 60)  # Reduced to make room for date
         
-        return f"{date_str} {safe_entry_title}.pdf"
+        # Prefix with the published date as MM-DD-YYYY (built from the
+        # fields directly, which skips strftime's format parsing)
+        return (
+            f"{published_date.month:02d}-{published_date.day:02d}-"
+            f"{published_date.year:04d} {safe_entry_title}.pdf"
+        )
     
     @staticmethod
     def get_feed_directory(feed_title):
         """Generate a safe directory name for the feed"""
-        safe_feed_title = "".join(
-            c for c in feed_title 
-            if c.isalnum() or c in (' ', '-', '_')
-        ).strip()
         # Keep spaces instead of replacing with underscores 
         # for reMarkable compatibility
-        safe_feed_title = safe_feed_title[:50]  # Limit length
-        
-        return safe_feed_title
+        return _sanitize(feed_title, 50)  # Limit length
     
     @staticmethod
     def setup_directories():
@@ -1,20 +1,407 @@
 import argparse
+import atexit
+import hashlib
+import html
+import io
+import json
 import logging
+import mmap
+import multiprocessing
+import os
+import queue
+import random
+import re
 import sys
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
-from bs4 import BeautifulSoup
 from dateutil import parser as date_parser
 import feedparser
+from feedparser.datetimes import _parse_date as _parse_feed_date
 from jinja2 import Environment, FileSystemLoader, select_autoescape
+from lxml import etree
+import nh3
 import requests
+from requests.adapters import HTTPAdapter
 from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
 
 from config import Config
 from remarkable import RemarkableUploader
 
+# Our formatter never prints thread, process or caller details, so skip
+# collecting them for every record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+logging._srcfile = None
+logging.raiseExceptions = False
+
+# Lines in feeds.txt must be http(s) URLs
+_FEED_URL_RE = re.compile(r'https?://', re.IGNORECASE)
+
+# Returned by fetch_feed when the server answers 304 Not Modified
+NOT_MODIFIED = object()
+
+# Upper bound in seconds on the delay between feed fetch retries
+FETCH_MAX_BACKOFF = 30
+
+# Elements stripped from feed content and attributes kept on the rest
+REMOVED_TAGS = frozenset(('script', 'style', 'iframe', 'object', 'embed'))
+SAFE_ATTRS = frozenset(('href', 'src', 'alt', 'title', 'class', 'id'))
+# Inline SVG drawings and the media and sectioning tags nh3 leaves out,
+# with the presentation attributes SVG needs to draw anything
+SVG_TAGS = frozenset((
+    'svg', 'g', 'path', 'circle', 'ellipse', 'line', 'polyline', 'polygon',
+    'rect', 'text', 'tspan'
+))
+SVG_ATTRS = frozenset((
+    'viewBox', 'width', 'height', 'x', 'y', 'x1', 'y1', 'x2', 'y2', 'cx',
+    'cy', 'r', 'rx', 'ry', 'd', 'points', 'transform', 'fill', 'stroke',
+    'stroke-width', 'opacity'
+))
+EXTRA_TAGS = SVG_TAGS | {'section', 'main', 'picture', 'source', 'video', 'audio'}
+# Other tags are unwrapped, keeping their text
+ALLOWED_TAGS = (frozenset(nh3.ALLOWED_TAGS) | EXTRA_TAGS) - REMOVED_TAGS
+ALLOWED_ATTRS = {'*': SAFE_ATTRS, **{tag: SVG_ATTRS for tag in SVG_TAGS}}
+# data: keeps inline images; nothing executes scripts in the rendered PDF
+URL_SCHEMES = frozenset(nh3.ALLOWED_URL_SCHEMES) | {'data'}
+
+# Content with only allowed tags, safe attribute names and no script URLs
+# can skip cleaning. Any "name=" in the text counts as an attribute, which
+# errs on the side of running the full cleaner
+_TAG_NAME_RE = re.compile(r'<\s*/?\s*([a-zA-Z][^\s/>]*)')
+_ATTR_NAME_RE = re.compile(r'([^\s"\'<>/=]+)\s*=')
+_SCRIPT_URL_RE = re.compile(r'(?:java|vb)script\s*:', re.IGNORECASE)
+# Whole tags, for checking that open and close tags balance
+_TAG_RE = re.compile(r'<\s*(/?)\s*([a-zA-Z][^\s/>]*)[^>]*>')
+_VOID_TAGS = frozenset((
+    'area', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'source', 'track', 'wbr'
+))
+# Comments, doctypes and processing instructions always go through nh3
+_STRAY_MARKUP_RE = re.compile(r'<(?![a-zA-Z/])')
+_URL_ATTR_RE = re.compile(
+    r'\b(?:href|src)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'>]+))',
+    re.IGNORECASE
+)
+_URL_SCHEME_RE = re.compile(r'([a-zA-Z][a-zA-Z0-9+.\-]*):')
+# Browsers drop these from URLs, so "java\tscript:" is still a scheme
+_URL_IGNORED_RE = re.compile(r'[\x00-\x20]')
+
+
+def _needs_cleaning(content: str) -> bool:
+    """
+    Return False only for content nh3 would leave alone: allowed tags that
+    balance, safe attribute names and href/src values with allowed schemes
+    """
+    if _STRAY_MARKUP_RE.search(content) or _SCRIPT_URL_RE.search(content):
+        return True
+    if any(name.lower() not in SAFE_ATTRS for name in _ATTR_NAME_RE.findall(content)):
+        return True
+    
+    tags = _TAG_RE.findall(content)
+    if len(tags) != len(_TAG_NAME_RE.findall(content)):
+        return True  # An unterminated tag
+    open_tags = []
+    for closing, name in tags:
+        name = name.lower()
+        if name not in ALLOWED_TAGS:
+            return True
+        if name in _VOID_TAGS:
+            continue
+        if not closing:
+            open_tags.append(name)
+        elif not open_tags or open_tags.pop() != name:
+            return True
+    if open_tags:
+        return True
+    
+    # Decode entities first, since "jav&#x61;script:" is a script URL too
+    for quoted, single, bare in _URL_ATTR_RE.findall(content):
+        url = _URL_IGNORED_RE.sub('', html.unescape(quoted or single or bare))
+        scheme = _URL_SCHEME_RE.match(url)
+        if scheme and scheme.group(1).lower() not in URL_SCHEMES:
+            return True
+    return False
+
+
+def _sanitize_html(content: str) -> str:
+    """
+    Clean HTML with nh3 (the Rust ammonia sanitizer) in one native pass.
+    Tags outside the allow-list are unwrapped, blocked tags are dropped
+    with their contents, and unsafe URLs are removed
+    """
+    return nh3.clean(
+        content,
+        tags=ALLOWED_TAGS,
+        clean_content_tags=REMOVED_TAGS,
+        attributes=ALLOWED_ATTRS,
+        url_schemes=URL_SCHEMES,
+        link_rel=None
+    )
+
+
+@lru_cache(maxsize=8)
+def _load_css(
+    css_path: str,
+    mtime_ns: int,
+    font_size: int,
+    max_image_width: int,
+    page_size: str,
+    margin: str
+) -> str:
+    """
+    Read the stylesheet and apply configurable values. The file's mtime is
+    part of the cache key so edits to the file are picked up
+    """
+    css_content = Path(css_path).read_text(encoding='utf-8')
+    
+    # Replace configurable values
+    css_content = css_content.replace('13px', f'{font_size}px')
+    css_content = css_content.replace('400px', f'{max_image_width}px')
+    css_content = css_content.replace('A4', page_size)
+    css_content = css_content.replace('0.375in', margin)
+    
+    return css_content
+
+
+@lru_cache(maxsize=1)
+def _stylesheet(css_string: str) -> CSS:
+    """Build the stylesheet once per worker process"""
+    return CSS(string=css_string)
+
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+RSS1_NS = '{http://purl.org/rss/1.0/}'
+CONTENT_NS = '{http://purl.org/rss/1.0/modules/content/}'
+DC_NS = '{http://purl.org/dc/elements/1.1/}'
+ENTRY_TAGS = frozenset((f'{ATOM_NS}entry', 'item', f'{RSS1_NS}item'))
+FEED_TAGS = frozenset((f'{ATOM_NS}feed', 'channel', f'{RSS1_NS}channel'))
+
+
+def _element_text(elem) -> str:
+    """Return an element's text, serializing any child markup (Atom xhtml)"""
+    if elem is None:
+        return ''
+    if len(elem) == 0:
+        return (elem.text or '').strip()
+    parts = [elem.text or '']
+    parts.extend(
+        etree.tostring(child, encoding='unicode', with_tail=True)
+        for child in elem
+    )
+    return ''.join(parts).strip()
+
+
+def _streamed_entry(elem) -> feedparser.FeedParserDict:
+    """Build a minimal feedparser-style entry from an Atom or RSS element"""
+    def text(*tags):
+        for tag in tags:
+            value = _element_text(elem.find(tag))
+            if value:
+                return value
+        return ''
+
+    entry = feedparser.FeedParserDict()
+    entry['title'] = text(f'{ATOM_NS}title', 'title', f'{RSS1_NS}title')
+
+    content = text(f'{ATOM_NS}content', f'{CONTENT_NS}encoded')
+    if content:
+        entry['content'] = [feedparser.FeedParserDict(value=content)]
+    summary = text(f'{ATOM_NS}summary', 'description', f'{RSS1_NS}description')
+    if summary:
+        entry['summary'] = summary
+
+    author = text(f'{ATOM_NS}author/{ATOM_NS}name', 'author', f'{DC_NS}creator')
+    if author:
+        entry['author'] = author
+
+    link = text('link', f'{RSS1_NS}link')
+    for link_elem in elem.iterfind(f'{ATOM_NS}link'):
+        if link_elem.get('rel', 'alternate') == 'alternate':
+            link = link_elem.get('href', '')
+            break
+    if link:
+        entry['link'] = link
+
+    entry_id = text(f'{ATOM_NS}id', 'guid')
+    if entry_id:
+        entry['id'] = entry_id
+
+    published = text(f'{ATOM_NS}published', 'pubDate', f'{DC_NS}date')
+    if published:
+        entry['published'] = published
+        entry['published_parsed'] = _parse_feed_date(published)
+    updated = text(f'{ATOM_NS}updated')
+    if updated:
+        entry['updated'] = updated
+        entry['updated_parsed'] = _parse_feed_date(updated)
+    return entry
+
+
+# Entry fields read by is_entry_recent and extract_entry_data
+ENTRY_KEYS = (
+    'title', 'content', 'summary', 'description', 'author', 'link', 'id',
+    'published', 'published_parsed', 'updated_parsed'
+)
+
+
+def _slim_entry(entry) -> feedparser.FeedParserDict:
+    """Copy only the fields the processor uses out of a parsed entry"""
+    slim = feedparser.FeedParserDict()
+    for key in ENTRY_KEYS:
+        value = entry.get(key)
+        if value is not None:
+            slim[key] = value
+    return slim
+
+
+def _parse_feed_streaming(content: bytes) -> feedparser.FeedParserDict:
+    """
+    Incrementally parse a large Atom/RSS document with lxml, keeping only
+    the fields the processor uses and freeing each entry once it is read
+    """
+    feed_title = None
+    entries = []
+    # Never load DTDs or expand entities: an external entity could pull
+    # local files (such as the rmapi token) into rendered content
+    events = etree.iterparse(
+        io.BytesIO(content), events=('end',),
+        resolve_entities=False, load_dtd=False, no_network=True
+    )
+    for _, elem in events:
+        if elem.tag in ENTRY_TAGS:
+            entries.append(_streamed_entry(elem))
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+        elif (feed_title is None and 
+              elem.tag in (f'{ATOM_NS}title', 'title', f'{RSS1_NS}title') and
+              elem.getparent() is not None and
+              elem.getparent().tag in FEED_TAGS):
+            feed_title = _element_text(elem)
+
+    return feedparser.FeedParserDict(
+        feed=feedparser.FeedParserDict(title=feed_title or 'Unknown Feed'),
+        entries=entries,
+        bozo=False
+    )
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_string(value: str) -> Optional[datetime]:
+    """Parse a free-form date string with dateutil, returning a naive datetime"""
+    try:
+        parsed = date_parser.parse(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    # Remove timezone info for comparison if present
+    if parsed.tzinfo:
+        parsed = parsed.replace(tzinfo=None)
+    return parsed
+
+
+def _utc_fields(local_time: datetime) -> Tuple[int, ...]:
+    """Return the UTC (year, month, day, hour, minute, second) of a local time"""
+    return tuple(time.gmtime(local_time.timestamp())[:6])
+
+
+# Images kept in memory between renders before the cache is emptied
+IMAGE_CACHE_ENTRIES = 256
+
+# Renders in a process run one at a time, so they share these options
+_render_state: Dict = {}
+
+
+def _render_options() -> Dict:
+    """
+    Return the font configuration and image cache reused for every render
+    in this process, so fonts are not re-enumerated and repeated images
+    are not fetched again for each article
+    """
+    options = _render_state.get('options')
+    if options is None:
+        options = {
+            'font_config': FontConfiguration(),
+            'cache': Config.IMAGE_CACHE_DIR or {}
+        }
+        _render_state['options'] = options
+    cache = options['cache']
+    if isinstance(cache, dict) and len(cache) >= IMAGE_CACHE_ENTRIES:
+        cache.clear()
+    return options
+
+
+def _write_pdf_atomic(html_doc, stylesheet, output_path: str):
+    """
+    Render a PDF into memory and move it into place in one step, so an
+    interrupted run never leaves a truncated PDF behind
+    """
+    buffer = io.BytesIO()
+    html_doc.write_pdf(buffer, stylesheets=[stylesheet], **_render_options())
+    data = buffer.getvalue()
+    if not data:
+        raise ValueError("WeasyPrint produced an empty PDF")
+    
+    tmp_path = f"{output_path}.tmp"
+    try:
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _warmup_renderer(css_string: str):
+    """
+    Render a throwaway PDF so Pango/fontconfig initialize before the first
+    article. Runs as the initializer of each render worker process
+    """
+    try:
+        HTML(string='<html></html>').write_pdf(
+            io.BytesIO(), stylesheets=[_stylesheet(css_string)], **_render_options()
+        )
+    except Exception as e:
+        logging.getLogger('AtomProcessor').debug(f"Renderer warmup failed: {e}")
+
+
+def _start_render_worker():
+    """No-op task whose only purpose is to make the pool spawn a worker"""
+
+
+def _render_pdf(html_content: str, css_string: str, output_path: str):
+    """Render HTML to a PDF file (runs in a worker process)"""
+    _write_pdf_atomic(
+        HTML(string=html_content), _stylesheet(css_string), output_path
+    )
+
+# The AtomProcessor logger's one queue listener. Setting up logging again
+# replaces it, so handlers and listener threads never stack up
+_log_state: Dict = {'listener': None, 'running': False}
+
+
+def _stop_log_listener():
+    """Flush queued log records and stop the listener thread, if running"""
+    if _log_state['running']:
+        _log_state['running'] = False
+        _log_state['listener'].stop()
+
+
+atexit.register(_stop_log_listener)
+
+
 class AtomFeedProcessor:
     def __init__(self):
         """Initialize the Atom feed processor for reMarkable Cloud upload"""
@@ -34,10 +421,43 @@ class AtomFeedProcessor:
             autoescape=select_autoescape(['html', 'xml'])
         )
         
+        # Template and stylesheet are invariant for the run, so build them once
+        self._template = self.template_env.get_template(self.template_name)
+        self._css_string = self.get_pdf_styles()
+        self._css_doc = CSS(string=self._css_string)
+        
+        # Reference times shared by every entry in a run
+        self._start_run_clock()
+        
+        # Process pool for PDF rendering and queue of PDFs awaiting upload,
+        # only set during process_all_feeds
+        self._render_pool = None
+        self._upload_queue = None
+        # Without a pool, feed threads render in this process and share the
+        # stylesheet, fonts and image cache, so only one renders at a time
+        self._render_lock = threading.Lock()
+        
+        # Conditional GET validators, keyed by feed URL. Validators from this
+        # run's responses wait in _pending_validators until the feed's PDFs
+        # have all rendered and uploaded, so failures are retried next run
+        self._http_cache = self.load_http_cache()
+        self._pending_validators = {}
+        self._feed_results = {}
+        
+        # Shared HTTP session so connections are reused across feeds
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=Config.FEED_WORKERS,
+            pool_maxsize=Config.FEED_WORKERS
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        
         # Initialize reMarkable uploader
         self.remarkable_uploader = RemarkableUploader()
         
-        # Statistics
+        # Statistics (feeds are processed concurrently, so guard updates)
+        self._stats_lock = threading.Lock()
         self.stats = {
             'feeds_processed': 0,
             'feeds_failed': 0,
@@ -48,8 +468,24 @@ class AtomFeedProcessor:
             'pdfs_failed': 0,
             'remarkable_uploaded': 0,
             'remarkable_skipped': 0,
-            'remarkable_failed': 0
+            'remarkable_failed': 0,
+            'html_fast_path': 0
         }
+        
+        # Load WeasyPrint's native libraries in the background while the
+        # first feeds are being fetched. Render workers warm up themselves
+        self._warmup_thread = None
+        if Config.PDF_WORKERS == 1:
+            self._warmup_thread = threading.Thread(
+                target=_warmup_renderer, args=(self._css_string,), daemon=True
+            )
+            self._warmup_thread.start()
+    
+    def _start_run_clock(self, now: Optional[datetime] = None):
+        """Capture the current time and recency cutoff for this run"""
+        self._run_now = now or datetime.now()
+        self._cutoff = self._run_now - timedelta(hours=Config.RECENT_HOURS)
+        self._cutoff_utc = _utc_fields(self._cutoff)
     
     def setup_logging(self):
         """Setup logging configuration"""
@@ -72,15 +508,41 @@ class AtomFeedProcessor:
         console_handler.setFormatter(formatter)
         console_handler.setLevel(logging.INFO)
         
-        # Setup logger
+        # Worker threads only enqueue records; a listener thread does the I/O.
+        # Replace any listener an earlier processor started
+        _stop_log_listener()
+        previous = _log_state['listener']
+        if previous is not None:
+            for handler in previous.handlers:
+                handler.close()
+        log_queue = queue.SimpleQueue()
+        _log_state['listener'] = QueueListener(
+            log_queue, file_handler, console_handler,
+            respect_handler_level=True
+        )
+        self.start_logging()
+        
+        # Setup logger, swapping out the queue handler of an earlier setup
         self.logger = logging.getLogger('AtomProcessor')
         self.logger.setLevel(logging.INFO)
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        for handler in list(self.logger.handlers):
+            if isinstance(handler, QueueHandler):
+                self.logger.removeHandler(handler)
+        self.logger.addHandler(QueueHandler(log_queue))
         
         # Prevent duplicate logs
         self.logger.propagate = False
     
+    def start_logging(self):
+        """Start the logging listener thread if it is not running"""
+        if not _log_state['running']:
+            _log_state['listener'].start()
+            _log_state['running'] = True
+    
+    def stop_logging(self):
+        """Flush queued log records and stop the logging listener thread"""
+        _stop_log_listener()
+    
     def load_feeds(self) -> List[str]:
         """Load feed URLs from feeds.txt file"""
         feeds_file = Path(Config.FEEDS_FILE)
@@ -90,21 +552,84 @@ class AtomFeedProcessor:
             return []
         
         try:
-            with open(feeds_file, 'r', encoding='utf-8') as f:
-                feeds = [
-                    line.strip() for line in f 
-                    if line.strip() and not line.startswith('#')
-                ]
+            with open(feeds_file, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    lines = []
+                else:
+                    # Read line by line from the mapping rather than copying
+                    # the whole file into one bytes object
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        lines = [
+                            line.strip() for line in iter(mm.readline, b'')
+                        ]
+            
+            urls = [
+                line.decode('utf-8') for line in lines 
+                if line and not line.startswith(b'#')
+            ]
             
-            self.logger.info(f"Loaded {len(feeds)} feed URLs from {feeds_file}")
-            return feeds
+            feeds = []
+            for url in urls:
+                if _FEED_URL_RE.match(url):
+                    feeds.append(url)
+                else:
+                    self.logger.warning(f"Skipping malformed feed URL: {url}")
+            
+            # Drop duplicates while keeping the file's order
+            unique_feeds = list(dict.fromkeys(feeds))
+            if len(unique_feeds) < len(feeds):
+                self.logger.warning(
+                    f"Ignoring {len(feeds) - len(unique_feeds)} duplicate feed URLs"
+                )
+            
+            self.logger.info(f"Loaded {len(unique_feeds)} feed URLs from {feeds_file}")
+            return unique_feeds
             
         except Exception as e:
             self.logger.error(f"Error reading feeds file: {e}")
             return []
     
+    def _http_cache_path(self) -> Path:
+        """Location of the ETag/Last-Modified cache file"""
+        if Config.HTTP_CACHE_FILE:
+            return Path(Config.HTTP_CACHE_FILE)
+        return Path(Config.LOG_DIR) / 'http_cache.json'
+    
+    def load_http_cache(self) -> Dict[str, Tuple[str, str]]:
+        """Load per-feed ETag/Last-Modified validators from the previous run"""
+        cache_path = self._http_cache_path()
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return {
+                url: (validators[0], validators[1])
+                for url, validators in data.items()
+            }
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            self.logger.warning(f"Ignoring unreadable HTTP cache {cache_path}: {e}")
+            return {}
+    
+    def save_http_cache(self):
+        """Persist per-feed ETag/Last-Modified validators for the next run"""
+        cache_path = self._http_cache_path()
+        try:
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(self._http_cache, f, indent=2)
+        except Exception as e:
+            self.logger.warning(f"Could not save HTTP cache {cache_path}: {e}")
+    
+    def _increment_stat(self, key: str, amount: int = 1):
+        """Thread-safe increment of a statistics counter"""
+        with self._stats_lock:
+            self.stats[key] += amount
+    
     def fetch_feed(self, feed_url: str) -> Optional[feedparser.FeedParserDict]:
-        """Fetch and parse a single feed"""
+        """
+        Fetch and parse a single feed. Returns NOT_MODIFIED when the feed
+        is unchanged since the last run
+        """
         try:
             self.logger.info(f"Fetching feed: {feed_url}")
             
@@ -116,20 +641,51 @@ class AtomFeedProcessor:
                 )
             }
             
-            response = requests.get(
-                feed_url, 
-                headers=headers, 
-                timeout=Config.REQUEST_TIMEOUT,
-                allow_redirects=True
-            )
-            response.raise_for_status()
+            # Ask the server to skip the body if the feed is unchanged
+            etag, last_modified = self._http_cache.get(feed_url, ('', ''))
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
             
-            feed = feedparser.parse(response.content)
+            response = self._get_with_retry(feed_url, headers)
+            try:
+                if response.status_code == 304:
+                    self.logger.info(f"Feed not modified since last run: {feed_url}")
+                    return NOT_MODIFIED
+                
+                response.raise_for_status()
+                
+                # Read the body incrementally so oversized feeds are rejected
+                # before they are fully held in memory
+                content = bytearray()
+                for chunk in response.iter_content(chunk_size=65536):
+                    content += chunk
+                    if len(content) > Config.MAX_FEED_BYTES:
+                        raise ValueError(
+                            f"feed exceeds {Config.MAX_FEED_BYTES} bytes"
+                        )
+            finally:
+                response.close()
+            
+            if len(content) > Config.STREAMING_PARSE_BYTES:
+                # Large feeds are parsed incrementally to bound memory use
+                try:
+                    feed = _parse_feed_streaming(bytes(content))
+                except etree.XMLSyntaxError:
+                    feed = feedparser.parse(bytes(content))
+            else:
+                feed = feedparser.parse(bytes(content))
             
             if feed.bozo:
                 self.logger.warning(
                     f"Feed has parsing issues but continuing: {feed_url}"
                 )
+            else:
+                self._pending_validators[feed_url] = (
+                    response.headers.get('ETag', ''),
+                    response.headers.get('Last-Modified', '')
+                )
             
             feed_title = feed.feed.get('title', 'Unknown Feed')
             entries_count = len(feed.entries)
@@ -146,73 +702,92 @@ class AtomFeedProcessor:
             self.logger.error(f"Error parsing feed {feed_url}: {e}")
             return None
     
-    def is_entry_recent(self, entry) -> Tuple[bool, Optional[datetime]]:
+    def _get_with_retry(self, feed_url: str, headers: Dict) -> requests.Response:
+        """GET a feed, retrying connection errors and 5xx responses with backoff"""
+        attempts = Config.FETCH_ATTEMPTS
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = self._session.get(
+                    feed_url, 
+                    headers=headers, 
+                    timeout=Config.REQUEST_TIMEOUT,
+                    allow_redirects=True,
+                    stream=True
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if last_attempt:
+                    raise
+                reason = str(e)
+            else:
+                if response.status_code < 500 or last_attempt:
+                    return response
+                response.close()
+                reason = f"HTTP {response.status_code}"
+            
+            # Full jitter keeps concurrent feed workers from retrying in step
+            delay = random.uniform(0, min(FETCH_MAX_BACKOFF, 2 ** attempt))
+            self.logger.warning(
+                f"Fetching {feed_url} failed ({reason}), retrying in "
+                f"{delay:.1f}s (attempt {attempt + 2} of {attempts})"
+            )
+            time.sleep(delay)
+    
+    def is_entry_recent(
+        self, 
+        entry, 
+        cutoff_time: Optional[datetime] = None
+    ) -> Tuple[bool, Optional[datetime]]:
         """Check if an entry was published within the recent time window"""
-        cutoff_time = Config.get_cutoff_time()
-        
-        # Try to get published date
-        published_date = None
+        if cutoff_time is None:
+            cutoff_time = Config.get_cutoff_time()
+        if cutoff_time is self._cutoff:
+            cutoff_utc = self._cutoff_utc
+        else:
+            cutoff_utc = _utc_fields(cutoff_time)
         
-        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-            try:
-                published_date = datetime(*entry.published_parsed[:6])
-            except (TypeError, ValueError):
-                pass
+        # feedparser's parsed times are UTC struct_times, so comparing their
+        # leading fields against the UTC cutoff orders them without building
+        # a datetime for every stale entry
+        for key in ('published_parsed', 'updated_parsed'):
+            parsed = entry.get(key)
+            if parsed:
+                try:
+                    fields = tuple(parsed[:6])
+                    if fields <= cutoff_utc:
+                        return False, None
+                    return True, datetime(*fields)
+                except (TypeError, ValueError):
+                    pass
         
-        if not published_date and hasattr(entry, 'published'):
-            try:
-                published_date = date_parser.parse(entry.published)
-                # Remove timezone info for comparison if present
-                if published_date.tzinfo:
-                    published_date = published_date.replace(tzinfo=None)
-            except (ValueError, TypeError):
-                pass
-        
-        if (not published_date and 
-            hasattr(entry, 'updated_parsed') and 
-            entry.updated_parsed):
-            try:
-                published_date = datetime(*entry.updated_parsed[:6])
-            except (TypeError, ValueError):
-                pass
+        # Slow path: feedparser could not parse the date string itself
+        published = entry.get('published')
+        published_date = _parse_date_string(published) if published else None
         
         if not published_date:
             # If no date found, assume it's not recent
             entry_title = entry.get('title', 'Unknown')
             self.logger.warning(
-                f"No published date found for entry: {entry_title}"
+                "No published date found for entry: %s", entry_title
             )
             return False, None
         
-        is_recent = published_date > cutoff_time
-        return is_recent, published_date
+        if published_date <= cutoff_time:
+            return False, None
+        return True, published_date
     
     def clean_html_content(self, content: str) -> str:
         """Clean and process HTML content"""
         if not content:
             return ""
         
+        # Fast path: nothing to remove, so skip parsing and re-serializing
+        if not _needs_cleaning(content):
+            self._increment_stat('html_fast_path')
+            return content
+        
         try:
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(content, 'html.parser')
-            
-            # Remove problematic elements
-            for element in soup(['script', 'style', 'iframe', 'object', 'embed']):
-                element.decompose()
-            
-            # Clean up attributes that might cause issues
-            for tag in soup.find_all(True):
-                # Keep only safe attributes
-                safe_attrs = ['href', 'src', 'alt', 'title', 'class', 'id']
-                tag.attrs = {
-                    k: v for k, v in tag.attrs.items() 
-                    if k in safe_attrs
-                }
-            
-            # Convert relative URLs to absolute ones (basic approach)
-            # Note: This is simplified - you might want to enhance based on feed base URL
-            
-            return str(soup)
+            return _sanitize_html(content)
             
         except Exception as e:
             self.logger.warning(f"Error cleaning HTML content: {e}")
@@ -238,7 +813,11 @@ class AtomFeedProcessor:
         # Get metadata
         author = entry.get('author', 'Unknown Author')
         link = entry.get('link', '')
-        entry_id = entry.get('id', f"entry_{hash(title)}")
+        # Fall back to a digest of the title, which unlike hash() is stable
+        # across runs
+        entry_id = entry.get('id') or (
+            f"entry_{hashlib.blake2b(title.encode('utf-8'), digest_size=8).hexdigest()}"
+        )
         
         return {
             'entry_title': title,
@@ -247,33 +826,30 @@ class AtomFeedProcessor:
             'author': author,
             'link': link,
             'entry_id': entry_id,
-            'generated_date': datetime.now()
+            'generated_date': self._run_now
         }
     
     def get_pdf_styles(self) -> str:
         """Return CSS styles for PDF generation from external file"""
         try:
             css_path = Path(Config.CSS_FILE)
-            if css_path.exists():
-                with open(css_path, 'r', encoding='utf-8') as f:
-                    css_content = f.read()
-                
-                # Replace configurable values
-                css_content = css_content.replace(
-                    '13px', f'{Config.PDF_FONT_SIZE}px'
-                )
-                css_content = css_content.replace(
-                    '400px', f'{Config.MAX_IMAGE_WIDTH}px'
-                )
-                css_content = css_content.replace('A4', Config.PDF_PAGE_SIZE)
-                css_content = css_content.replace('0.375in', Config.PDF_MARGIN)
-                
-                return css_content
-            else:
+            try:
+                mtime_ns = os.stat(css_path).st_mtime_ns
+            except FileNotFoundError:
                 self.logger.warning(
                     f"CSS file not found: {css_path}, using fallback styles"
                 )
                 return self.get_fallback_styles()
+            
+            # Cached per file version and configuration
+            return _load_css(
+                str(css_path),
+                mtime_ns,
+                Config.PDF_FONT_SIZE,
+                Config.MAX_IMAGE_WIDTH,
+                Config.PDF_PAGE_SIZE,
+                Config.PDF_MARGIN
+            )
         except Exception as e:
             self.logger.error(
                 f"Error reading CSS file: {e}, using fallback styles"
@@ -311,14 +887,11 @@ class AtomFeedProcessor:
     ) -> Tuple[Optional[Path], bool]:
         """Generate PDF from entry data. Returns (path, was_skipped)"""
         try:
-            # Load template
-            template = self.template_env.get_template(self.template_name)
-            
             # Add published date to entry data
             entry_data['published'] = published_date
             
             # Render HTML
-            html_content = template.render(**entry_data)
+            html_content = self._template.render(**entry_data)
             
             # Create feed subdirectory
             feed_dir = Config.get_feed_directory(feed_title)
@@ -336,21 +909,34 @@ class AtomFeedProcessor:
             output_path = output_feed_path / base_filename
             if output_path.exists():
                 self.logger.info(
-                    f"PDF already exists, skipping: {feed_dir}/{base_filename}"
+                    "PDF already exists, skipping: %s/%s", feed_dir, base_filename
                 )
                 return output_path, True  # Return existing file path and skipped=True
             
             # Use the filename for logging
-            self.logger.info(f"Generating PDF: {feed_dir}/{base_filename}")
+            self.logger.info("Generating PDF: %s/%s", feed_dir, base_filename)
             
             # Create PDF
             try:
-                self.logger.info(f"Creating HTML document...")
-                html_doc = HTML(string=html_content)
-                self.logger.info(f"Creating CSS document...")
-                css_doc = CSS(string=self.get_pdf_styles())
-                self.logger.info(f"Writing PDF to {output_path}...")
-                html_doc.write_pdf(str(output_path), stylesheets=[css_doc])
+                if self._render_pool is not None:
+                    # Layout is CPU-bound, so hand it to a worker process
+                    self.logger.debug("Rendering PDF in worker: %s", output_path)
+                    self._render_pool.submit(
+                        _render_pdf,
+                        html_content,
+                        self._css_string,
+                        str(output_path)
+                    ).result()
+                else:
+                    if self._warmup_thread is not None:
+                        self._warmup_thread.join()
+                    with self._render_lock:
+                        self.logger.debug("Creating HTML document...")
+                        html_doc = HTML(string=html_content)
+                        self.logger.debug("Writing PDF to %s...", output_path)
+                        _write_pdf_atomic(
+                            html_doc, self._css_doc, str(output_path)
+                        )
             except Exception as pdf_error:
                 self.logger.error(f"Detailed PDF error: {pdf_error}")
                 self.logger.error(f"Error type: {type(pdf_error)}")
@@ -358,7 +944,7 @@ class AtomFeedProcessor:
                 self.logger.error(f"Traceback: {traceback.format_exc()}")
                 raise pdf_error
             
-            self.logger.info(f"PDF generated successfully: {output_path}")
+            self.logger.info("PDF generated successfully: %s", output_path)
             return output_path, False  # Return new file path and skipped=False
             
         except Exception as e:
@@ -366,32 +952,74 @@ class AtomFeedProcessor:
             self.logger.error(f"Error generating PDF for '{entry_title}': {e}")
             return None, False
     
+    def _list_existing_pdfs(self, feed_path: Path) -> Set[str]:
+        """Return the names of PDFs already present in a feed directory"""
+        try:
+            with os.scandir(feed_path) as it:
+                return {
+                    item.name for item in it
+                    if item.is_file() and item.name.endswith('.pdf')
+                }
+        except FileNotFoundError:
+            return set()
+    
     def process_feed(self, feed_url: str) -> Tuple[int, List[Path]]:
         """
         Process a single feed and return number of PDFs generated 
         and list of PDF paths
         """
         feed = self.fetch_feed(feed_url)
+        if feed is NOT_MODIFIED:
+            self._increment_stat('feeds_processed')
+            return 0, []
         if not feed:
-            self.stats['feeds_failed'] += 1
+            self._increment_stat('feeds_failed')
             return 0, []
         
-        self.stats['feeds_processed'] += 1
+        self._increment_stat('feeds_processed')
         feed_title = feed.feed.get('title', 'Unknown Feed')
+        # Keep just the fields we need and drop the parsed feed, so several
+        # large feeds in flight at once don't hold their full results
+        entries = [_slim_entry(entry) for entry in feed.entries]
+        del feed
         pdfs_generated = 0
+        pdfs_failed = 0
         pdf_paths = []
         
-        self.stats['entries_found'] += len(feed.entries)
+        self._increment_stat('entries_found', len(entries))
         
-        for entry in feed.entries:
+        # List the feed directory once so entries rendered on a previous run
+        # are skipped before any HTML cleanup or rendering happens
+        feed_dir = Config.get_feed_directory(feed_title)
+        output_feed_path = Path(Config.OUTPUT_DIR) / feed_dir
+        existing_pdfs = self._list_existing_pdfs(output_feed_path)
+        for entry in entries:
             try:
                 # Check if entry is recent
-                is_recent, published_date = self.is_entry_recent(entry)
+                is_recent, published_date = self.is_entry_recent(
+                    entry, self._cutoff
+                )
                 
                 if not is_recent:
                     continue
                 
-                self.stats['entries_recent'] += 1
+                self._increment_stat('entries_recent')
+                
+                base_filename = Config.get_output_filename(
+                    entry.get('title', 'Untitled').strip(),
+                    feed_title,
+                    published_date
+                )
+                if base_filename in existing_pdfs:
+                    self.logger.info(
+                        "PDF already exists, skipping: %s/%s",
+                        feed_dir, base_filename
+                    )
+                    self._increment_stat('pdfs_skipped')
+                    pdfs_generated += 1
+                    pdf_paths.append(output_feed_path / base_filename)
+                    self._queue_upload(output_feed_path / base_filename)
+                    continue
                 
                 # Extract entry data
                 entry_data = self.extract_entry_data(entry, feed_title)
@@ -403,31 +1031,80 @@ class AtomFeedProcessor:
                 
                 if pdf_path:
                     if was_skipped:
-                        self.stats['pdfs_skipped'] += 1
+                        self._increment_stat('pdfs_skipped')
                     else:
-                        self.stats['pdfs_generated'] += 1
+                        self._increment_stat('pdfs_generated')
                     pdfs_generated += 1
                     pdf_paths.append(pdf_path)
+                    self._queue_upload(pdf_path)
                 else:
-                    self.stats['pdfs_failed'] += 1
+                    self._increment_stat('pdfs_failed')
+                    pdfs_failed += 1
                     
             except Exception as e:
                 entry_title = entry.get('title', 'Unknown')
                 self.logger.error(
                     f"Error processing entry '{entry_title}': {e}"
                 )
-                self.stats['pdfs_failed'] += 1
+                self._increment_stat('pdfs_failed')
+                pdfs_failed += 1
                 continue
         
+        self._feed_results[feed_url] = (pdfs_failed, pdf_paths)
         self.logger.info(
-            f"Feed '{feed_title}': Generated {pdfs_generated} PDFs from recent entries"
+            "Feed '%s': Generated %d PDFs from recent entries",
+            feed_title, pdfs_generated
         )
         return pdfs_generated, pdf_paths
     
+    def _commit_validators(self, failed_uploads: Set[Path], uploads_finished: bool):
+        """
+        Keep this run's validators only for feeds whose PDFs all rendered
+        and uploaded; the rest are fetched in full again next run. If the
+        uploader stopped early, no feed counts as uploaded
+        """
+        for feed_url, validators in self._pending_validators.items():
+            pdfs_failed, pdf_paths = self._feed_results.get(feed_url, (1, []))
+            if (not uploads_finished or pdfs_failed
+                    or any(path in failed_uploads for path in pdf_paths)):
+                self._http_cache.pop(feed_url, None)
+            else:
+                self._http_cache[feed_url] = validators
+        self._pending_validators.clear()
+        self._feed_results.clear()
+    
+    def _queue_upload(self, pdf_path: Path):
+        """Hand a PDF to the background uploader when a run is in progress"""
+        if self._upload_queue is not None:
+            self._upload_queue.put(pdf_path)
+    
+    def _safe_process_feed(self, feed_url: str) -> Tuple[int, List[Path]]:
+        """Process a feed, recording unexpected errors as a failed feed"""
+        try:
+            return self.process_feed(feed_url)
+        except Exception as e:
+            self.logger.error(
+                f"Unexpected error processing feed {feed_url}: {e}"
+            )
+            self._increment_stat('feeds_failed')
+            return 0, []
+    
     def process_all_feeds(self) -> Dict:
         """Process all feeds from feeds.txt and upload to reMarkable Cloud"""
+        # Every recency check in this run, including Config.get_cutoff_time()
+        # callers, counts back from the same instant
+        self.start_logging()
+        self._start_run_clock(Config.freeze_cutoff())
+        try:
+            return self._process_all_feeds()
+        finally:
+            Config.unfreeze_cutoff()
+            self.stop_logging()
+    
+    def _process_all_feeds(self) -> Dict:
+        """Run one pass over all feeds once the run clock is set"""
         self.logger.info("=" * 60)
-        start_time = datetime.now().strftime(Config.LOG_DATE_FORMAT)
+        start_time = self._run_now.strftime(Config.LOG_DATE_FORMAT)
         self.logger.info(f"Starting feed processing run at {start_time}")
         self.logger.info(
             f"Looking for entries published within the last {Config.RECENT_HOURS} hours"
@@ -445,35 +1122,75 @@ class AtomFeedProcessor:
             'pdfs_failed': 0,
             'remarkable_uploaded': 0,
             'remarkable_skipped': 0,
-            'remarkable_failed': 0
+            'remarkable_failed': 0,
+            'html_fast_path': 0
         }
         
+        self._pending_validators.clear()
+        self._feed_results.clear()
         feeds = self.load_feeds()
         if not feeds:
             self.logger.error("No feeds to process")
             return self.stats
 
-        generated_pdfs = []  # Track all generated PDFs for reMarkable upload
-        total_pdfs = 0
+        # PDFs are uploaded to reMarkable Cloud (core functionality) by a
+        # background thread as soon as they are produced
+        upload_queue = queue.Queue()
+        upload_results = {}
+        failed_uploads = set()
+        uploads_finished = False
+
+        def record_upload(pdf_path: Path, ok: bool):
+            if not ok:
+                failed_uploads.add(pdf_path)
 
-        for feed_url in feeds:
+        def run_uploads():
+            nonlocal uploads_finished
             try:
-                pdfs_count, feed_pdfs = self.process_feed(feed_url)
-                total_pdfs += pdfs_count
-                generated_pdfs.extend(feed_pdfs)
-            except Exception as e:
-                self.logger.error(
-                    f"Unexpected error processing feed {feed_url}: {e}"
+                upload_results.update(
+                    self.remarkable_uploader.upload_stream(
+                        upload_queue, on_result=record_upload
+                    )
                 )
-                self.stats['feeds_failed'] += 1
-                continue
+                uploads_finished = True
+            except Exception as e:
+                self.logger.error(f"Uploader stopped unexpectedly: {e}")
 
-        # Upload to reMarkable Cloud (core functionality)
-        if generated_pdfs:
-            self.logger.info(
-                f"Uploading {len(generated_pdfs)} PDFs to reMarkable Cloud..."
+        upload_thread = threading.Thread(target=run_uploads, daemon=True)
+        upload_thread.start()
+        self._upload_queue = upload_queue
+
+        # Feeds are network-bound, so fetch and process them concurrently;
+        # PDF rendering is CPU-bound and goes to a separate process pool
+        max_workers = min(Config.FEED_WORKERS, len(feeds))
+        render_pool = None
+        if Config.PDF_WORKERS > 1:
+            render_pool = ProcessPoolExecutor(
+                max_workers=Config.PDF_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_warmup_renderer,
+                initargs=(self._css_string,)
             )
-            upload_results = self.remarkable_uploader.upload_pdfs(generated_pdfs)
+            # Workers are spawned lazily on submit, so start them all now to
+            # warm up while feeds are fetched rather than at the first render
+            for _ in range(Config.PDF_WORKERS):
+                render_pool.submit(_start_render_worker)
+        self._render_pool = render_pool
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(self._safe_process_feed, feeds))
+        finally:
+            self._render_pool = None
+            if render_pool is not None:
+                render_pool.shutdown()
+            self._upload_queue = None
+            upload_queue.put(None)  # Let the uploader finish the backlog
+
+        upload_thread.join()
+        self._commit_validators(failed_uploads, uploads_finished)
+        self.save_http_cache()
+
+        if upload_results:
             self.stats['remarkable_uploaded'] = upload_results['uploaded']
             self.stats['remarkable_skipped'] = upload_results['skipped']
             self.stats['remarkable_failed'] = upload_results['failed']
@@ -488,6 +1205,7 @@ class AtomFeedProcessor:
         self.logger.info(f"  PDFs generated: {self.stats['pdfs_generated']}")
         self.logger.info(f"  PDFs skipped: {self.stats['pdfs_skipped']}")
         self.logger.info(f"  PDFs failed: {self.stats['pdfs_failed']}")
+        self.logger.info(f"  HTML cleanup skipped: {self.stats['html_fast_path']}")
         self.logger.info(f"  reMarkable uploaded: {self.stats['remarkable_uploaded']}")
         self.logger.info(f"  reMarkable skipped: {self.stats['remarkable_skipped']}")
         self.logger.info(f"  reMarkable failed: {self.stats['remarkable_failed']}")
@@ -1,31 +1,121 @@
 """
 reMarkable Cloud integration using rmapi
 """
+import queue
+import shutil
 import subprocess
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, Dict, List, Optional, Set, Tuple
 from config import Config
 
+# rmapi errors worth retrying: dropped connections, timeouts and
+# gateway errors from the cloud
+TRANSIENT_ERRORS = (
+    'connection', 'timeout', 'timed out', 'temporarily', 'eof',
+    '502', '503', '504'
+)
+
+class RemoteIndex:
+    """Cached document names per reMarkable folder, relisted after a TTL"""
+    
+    def __init__(self, lister: Callable[[str], Optional[Set[str]]], ttl: float = 60.0):
+        # lister returns a folder's document names, or None if it can't
+        self._lister = lister
+        self.ttl = ttl
+        self._folders: Dict[str, Tuple[float, Optional[Set[str]]]] = {}
+        self._lock = threading.Lock()
+        self._folder_locks: Dict[str, threading.Lock] = {}
+    
+    def _fresh(self, folder: str) -> Tuple[bool, Optional[Set[str]]]:
+        """Return whether a folder has a live cache entry, and its names"""
+        entry = self._folders.get(folder)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return False, None
+        return True, entry[1]
+    
+    def refresh(self, folder: str) -> Optional[Set[str]]:
+        """List a folder now and cache the result"""
+        names = self._lister(folder)
+        self._folders[folder] = (time.monotonic(), names)
+        return names
+    
+    def names(self, folder: str) -> Optional[Set[str]]:
+        """Return a folder's document names, listing it if not cached"""
+        # Lock per folder so different folders can be listed in parallel
+        with self._lock:
+            folder_lock = self._folder_locks.setdefault(folder, threading.Lock())
+        with folder_lock:
+            cached, names = self._fresh(folder)
+            if cached:
+                return names
+            return self.refresh(folder)
+    
+    def cached(self, folder: str) -> Optional[Set[str]]:
+        """Return a folder's cached names without listing it"""
+        return self._fresh(folder)[1]
+    
+    def contains(self, folder: str, name: str) -> Optional[bool]:
+        """Check a folder for a document, or None if it can't be listed"""
+        names = self.names(folder)
+        if names is None:
+            return None
+        return name in names
+    
+    def add(self, folder: str, name: str):
+        """Record a document uploaded to a folder"""
+        names = self.cached(folder)
+        if names is not None:
+            names.add(name)
+
+
 class RemarkableUploader:
     """Handles uploading PDFs to reMarkable Cloud using rmapi"""
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.rmapi_path = Config.RMAPI_PATH
+        # subprocess only takes its posix_spawn fast path for an executable
+        # given with a directory, so resolve a bare name against PATH once
+        self._rmapi_executable = shutil.which(self.rmapi_path) or self.rmapi_path
         self.folder_name = Config.REMARKABLE_FOLDER
+        # Document names per remote folder, so existence checks don't need
+        # a find per file
+        self.index = RemoteIndex(lambda folder: self._load_remote_index(folder))
+        # Folders already found or created during this run
+        self._known_folders: Set[str] = set()
+        self._rmapi_ok = False
         
-    def check_rmapi_available(self) -> bool:
+    def _run(self, args: List[str], timeout: int) -> subprocess.CompletedProcess:
+        """Run an rmapi command and capture its output"""
+        # stdin is closed so rmapi fails fast instead of waiting on a prompt.
+        # Python's own descriptors are non-inheritable already, so skipping
+        # the close_fds sweep is safe
+        return subprocess.run(
+            [self.rmapi_path, *args],
+            executable=self._rmapi_executable,
+            capture_output=True,
+            text=True,
+            stdin=subprocess.DEVNULL,
+            close_fds=False,
+            timeout=timeout
+        )
+    
+    def check_rmapi_available(self, force: bool = False) -> bool:
         """Check if rmapi is available and configured"""
+        # Only a successful check is remembered; failures are retried
+        if self._rmapi_ok and not force:
+            return True
+        self._rmapi_ok = False
+        
         try:
-            result = subprocess.run(
-                [self.rmapi_path, 'version'],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = self._run(['version'], timeout=30)
             if result.returncode == 0:
                 self.logger.info(f"rmapi available: {result.stdout.strip()}")
+                self._rmapi_ok = True
                 return True
             else:
                 self.logger.error(f"rmapi error: {result.stderr}")
@@ -42,35 +132,31 @@ class RemarkableUploader:
     
     def ensure_folder_exists(self) -> bool:
         """Ensure the target folder exists in reMarkable Cloud"""
+        if self.folder_name in self._known_folders:
+            return True
+        
         try:
             # Check if folder already exists
-            result = subprocess.run(
-                [self.rmapi_path, 'find', self.folder_name],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = self._run(['find', self.folder_name], timeout=30)
             
             if result.returncode == 0 and result.stdout.strip():
                 self.logger.info(f"Folder '{self.folder_name}' already exists")
+                self._known_folders.add(self.folder_name)
                 return True
             
             # Create folder if it doesn't exist
             self.logger.info(f"Creating folder '{self.folder_name}' in reMarkable Cloud")
-            result = subprocess.run(
-                [self.rmapi_path, 'mkdir', self.folder_name],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = self._run(['mkdir', self.folder_name], timeout=30)
             
             if result.returncode == 0:
                 self.logger.info(f"Successfully created folder '{self.folder_name}'")
+                self._known_folders.add(self.folder_name)
                 return True
             else:
                 # Check if it failed because folder already exists
                 if "already exists" in result.stderr.lower():
                     self.logger.info(f"Folder '{self.folder_name}' already exists")
+                    self._known_folders.add(self.folder_name)
                     return True
                 self.logger.error(f"Failed to create folder: {result.stderr}")
                 return False
@@ -84,35 +170,23 @@ class RemarkableUploader:
     
     def ensure_subfolder_exists(self, subfolder_path: str) -> bool:
         """Ensure a subfolder exists in reMarkable Cloud"""
+        if subfolder_path in self._known_folders:
+            return True
+        
         try:
-            # Check if subfolder already exists
-            result = subprocess.run(
-                [self.rmapi_path, 'find', subfolder_path],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            if result.returncode == 0 and result.stdout.strip():
-                self.logger.info(f"Subfolder '{subfolder_path}' already exists")
-                return True
-            
-            # Create subfolder if it doesn't exist
-            self.logger.info(f"Creating subfolder '{subfolder_path}' in reMarkable Cloud")
-            result = subprocess.run(
-                [self.rmapi_path, 'mkdir', subfolder_path],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            # mkdir fails with "already exists" for an existing folder, so
+            # there is no need to look the subfolder up first
+            result = self._run(['mkdir', subfolder_path], timeout=30)
             
             if result.returncode == 0:
                 self.logger.info(f"Successfully created subfolder '{subfolder_path}'")
+                self._known_folders.add(subfolder_path)
                 return True
             else:
                 # Check if it failed because folder already exists
                 if "already exists" in result.stderr.lower():
                     self.logger.info(f"Subfolder '{subfolder_path}' already exists")
+                    self._known_folders.add(subfolder_path)
                     return True
                 self.logger.error(f"Failed to create subfolder: {result.stderr}")
                 return False
@@ -128,12 +202,7 @@ class RemarkableUploader:
         """Check if a file already exists in reMarkable Cloud"""
         try:
             # Use rmapi find to check if file exists
-            result = subprocess.run(
-                [self.rmapi_path, 'find', file_path],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = self._run(['find', file_path], timeout=30)
             
             # If find returns 0 and has output, file exists
             if result.returncode == 0 and result.stdout.strip():
@@ -154,19 +223,86 @@ class RemarkableUploader:
         else:
             return f"{self.folder_name}/{file_name}"
     
+    def get_target_folder(self, feed_subfolder: Optional[str] = None) -> str:
+        """Get the reMarkable folder a feed's PDFs are uploaded to"""
+        if feed_subfolder:
+            return f"{self.folder_name}/{feed_subfolder}"
+        return self.folder_name
+    
+    def _load_remote_index(self, folder: str) -> Optional[Set[str]]:
+        """List a reMarkable folder and return the document names in it"""
+        try:
+            result = self._run(['ls', folder], timeout=30)
+            if result.returncode != 0:
+                self.logger.warning(
+                    f"Could not list '{folder}', checking files individually: "
+                    f"{result.stderr.strip()}"
+                )
+                return None
+            
+            # rmapi prints one entry per line as "[f]\tname" or "[d]\tname"
+            names = set()
+            for line in result.stdout.splitlines():
+                kind, _, name = line.partition('\t')
+                if kind.strip() == '[f]' and name:
+                    names.add(name)
+            return names
+            
+        except Exception as e:
+            self.logger.warning(f"Error listing '{folder}', checking files individually: {e}")
+            return None
+    
+    def _remote_names(self, folder: str) -> Optional[Set[str]]:
+        """Return the cached listing of a folder, listing it on first use"""
+        names = self.index.names(folder)
+        if names is not None:
+            # A folder that can be listed exists
+            self._known_folders.add(folder)
+        return names
+    
+    def _is_uploaded(self, pdf_path: Path, feed_subfolder: Optional[str], names: Optional[Set[str]]) -> bool:
+        """Check a folder listing for a PDF, falling back to rmapi find"""
+        if names is not None:
+            return pdf_path.stem in names
+        remarkable_file_path = self.get_remarkable_file_path(pdf_path, feed_subfolder)
+        return self.file_exists_in_remarkable(remarkable_file_path)
+    
+    def _run_with_retry(self, args: List[str], timeout: int) -> subprocess.CompletedProcess:
+        """
+        Run an rmapi command, retrying transient failures with backoff.
+        Timeouts are raised rather than retried, since the command may
+        still have taken effect
+        """
+        attempts = Config.UPLOAD_ATTEMPTS
+        for attempt in range(attempts):
+            result = self._run(args, timeout=timeout)
+            if result.returncode == 0 or attempt == attempts - 1:
+                return result
+            stderr = result.stderr.lower()
+            if not any(marker in stderr for marker in TRANSIENT_ERRORS):
+                return result
+            
+            delay = 2 ** attempt
+            self.logger.warning(
+                f"rmapi {args[0]} failed ({result.stderr.strip()}), retrying in {delay}s "
+                f"(attempt {attempt + 2} of {attempts})"
+            )
+            time.sleep(delay)
+    
     def upload_pdf(self, pdf_path: Path, feed_subfolder: Optional[str] = None) -> bool:
         """Upload a single PDF to reMarkable Cloud"""
         try:
-            # Check if file already exists in reMarkable Cloud
-            remarkable_file_path = self.get_remarkable_file_path(pdf_path, feed_subfolder)
-            if self.file_exists_in_remarkable(remarkable_file_path):
+            target_folder = self.get_target_folder(feed_subfolder)
+            
+            # Check if file already exists in reMarkable Cloud, using the
+            # folder listing when one has been loaded
+            names = self.index.cached(target_folder)
+            if self._is_uploaded(pdf_path, feed_subfolder, names):
                 self.logger.info(f"File already exists in reMarkable Cloud, skipping: {pdf_path.name}")
                 return True  # Consider this a successful "upload"
             
-            # Determine target folder path
+            # Make sure the target folder exists
             if feed_subfolder:
-                target_folder = f"{self.folder_name}/{feed_subfolder}"
-                
                 # Ensure main folder exists first
                 if not self.ensure_folder_exists():
                     return False
@@ -175,22 +311,29 @@ class RemarkableUploader:
                 if not self.ensure_subfolder_exists(target_folder):
                     return False
             else:
-                target_folder = self.folder_name
                 if not self.ensure_folder_exists():
                     return False
             
             self.logger.info(f"Uploading {pdf_path.name} to reMarkable folder: {target_folder}")
             
-            # Upload the PDF
-            result = subprocess.run(
-                [self.rmapi_path, 'put', str(pdf_path), target_folder],
-                capture_output=True,
-                text=True,
-                timeout=120  # Longer timeout for uploads
-            )
+            # Upload the PDF, retrying transient network failures
+            try:
+                result = self._run_with_retry(
+                    ['put', str(pdf_path), target_folder],
+                    timeout=120  # Longer timeout for uploads
+                )
+            except subprocess.TimeoutExpired:
+                # The upload may have finished anyway, so check the folder
+                # rather than putting a second copy
+                names = self.index.refresh(target_folder)
+                if names is not None and pdf_path.stem in names:
+                    self.logger.info(f"Upload of {pdf_path.name} timed out but the file arrived")
+                    return True
+                raise
             
             if result.returncode == 0:
                 self.logger.info(f"Successfully uploaded {pdf_path.name}")
+                self.index.add(target_folder, pdf_path.stem)
                 return True
             else:
                 self.logger.error(f"Failed to upload {pdf_path.name}: {result.stderr}")
@@ -203,8 +346,55 @@ class RemarkableUploader:
             self.logger.error(f"Error uploading {pdf_path.name}: {e}")
             return False
     
+    def get_feed_subfolder(self, pdf_path: Path) -> Optional[str]:
+        """Extract the feed subfolder from a PDF's output path, if any"""
+        # e.g., output/Simon_Willisons_Weblog/file.pdf -> Simon_Willisons_Weblog
+        parts = pdf_path.parts
+        if len(parts) >= 3 and parts[-3] == 'output':
+            return parts[-2]
+        return None
+    
+    def _plan_uploads(
+        self, 
+        pdf_files: List[Path]
+    ) -> Tuple[List[Tuple[Path, Optional[str]]], Set[str]]:
+        """Pair each PDF with its feed subfolder and collect the target folders"""
+        tasks = []
+        folders = set()
+        for pdf_path in pdf_files:
+            feed_subfolder = self.get_feed_subfolder(pdf_path)
+            tasks.append((pdf_path, feed_subfolder))
+            folders.add(self.get_target_folder(feed_subfolder))
+        return tasks, folders
+    
+    def upload_one(self, pdf_path: Path) -> str:
+        """Upload a single PDF, returning 'uploaded', 'skipped' or 'failed'"""
+        return self._upload_task(pdf_path, self.get_feed_subfolder(pdf_path))
+    
+    def _upload_task(self, pdf_path: Path, feed_subfolder: Optional[str]) -> str:
+        """Upload a PDF to its feed subfolder unless it is already there"""
+        try:
+            # Check if file already exists in reMarkable Cloud before uploading.
+            # Each folder is listed once instead of running find per file
+            names = self._remote_names(self.get_target_folder(feed_subfolder))
+            if self._is_uploaded(pdf_path, feed_subfolder, names):
+                self.logger.info(f"File already exists in reMarkable Cloud, skipping: {pdf_path.name}")
+                return 'skipped'
+            
+            if self.upload_pdf(pdf_path, feed_subfolder):
+                return 'uploaded'
+            return 'failed'
+                
+        except Exception as e:
+            self.logger.error(f"Unexpected error processing {pdf_path.name}: {e}")
+            return 'failed'
+    
     def upload_pdfs(self, pdf_files: List[Path]) -> dict:
         """Upload multiple PDFs to reMarkable Cloud"""
+        # Nothing new is the common case; don't start rmapi for it
+        if not pdf_files:
+            return {'uploaded': 0, 'failed': 0, 'skipped': 0}
+        
         if not self.check_rmapi_available():
             self.logger.error("rmapi not available, cannot upload to reMarkable")
             return {'uploaded': 0, 'failed': 0, 'skipped': len(pdf_files)}
@@ -213,37 +403,74 @@ class RemarkableUploader:
             self.logger.error("Failed to ensure folder exists, skipping uploads")
             return {'uploaded': 0, 'failed': 0, 'skipped': len(pdf_files)}
         
-        uploaded = 0
-        failed = 0
-        skipped = 0
+        results = {'uploaded': 0, 'failed': 0, 'skipped': 0}
+        tasks, folders = self._plan_uploads(pdf_files)
+        # Uploads are bound by cloud round trips, so run several at once
+        with ThreadPoolExecutor(max_workers=Config.UPLOAD_CONCURRENCY) as executor:
+            # List every target folder up front rather than as uploads reach it
+            list(executor.map(self._remote_names, folders))
+            for outcome in executor.map(lambda task: self._upload_task(*task), tasks):
+                results[outcome] += 1
         
-        for pdf_path in pdf_files:
-            try:
-                # Extract feed subfolder from path if it exists
-                # e.g., output/Simon_Willisons_Weblog/file.pdf -> Simon_Willisons_Weblog
-                parts = pdf_path.parts
-                feed_subfolder = None
-                if len(parts) >= 3 and parts[-3] == 'output':
-                    feed_subfolder = parts[-2]
+        self.logger.info(
+            f"reMarkable upload summary: {results['uploaded']} uploaded, "
+            f"{results['skipped']} skipped, {results['failed']} failed"
+        )
+        return results
+    
+    def upload_stream(
+        self,
+        pdf_queue: queue.Queue,
+        on_result: Optional[Callable[[Path, bool], None]] = None
+    ) -> dict:
+        """
+        Upload PDFs from a queue as they are produced, until a None sentinel
+        is received. rmapi and the target folder are checked on the first PDF.
+        on_result, if given, is called with each PDF and whether it is now
+        in reMarkable Cloud
+        """
+        results = {'uploaded': 0, 'failed': 0, 'skipped': 0}
+        ready = None
+        futures = []
+        
+        with ThreadPoolExecutor(max_workers=Config.UPLOAD_CONCURRENCY) as executor:
+            while True:
+                pdf_path = pdf_queue.get()
+                if pdf_path is None:
+                    break
+                
+                if ready is None:
+                    if not self.check_rmapi_available():
+                        self.logger.error("rmapi not available, cannot upload to reMarkable")
+                        ready = False
+                    elif not self.ensure_folder_exists():
+                        self.logger.error("Failed to ensure folder exists, skipping uploads")
+                        ready = False
+                    else:
+                        ready = True
                 
-                # Check if file already exists in reMarkable Cloud before uploading
-                remarkable_file_path = self.get_remarkable_file_path(pdf_path, feed_subfolder)
-                if self.file_exists_in_remarkable(remarkable_file_path):
-                    self.logger.info(f"File already exists in reMarkable Cloud, skipping: {pdf_path.name}")
-                    skipped += 1
+                if not ready:
+                    results['skipped'] += 1
+                    if on_result:
+                        on_result(pdf_path, False)
                     continue
                 
-                if self.upload_pdf(pdf_path, feed_subfolder):
-                    uploaded += 1
-                else:
-                    failed += 1
-                    
-            except Exception as e:
-                self.logger.error(f"Unexpected error processing {pdf_path.name}: {e}")
-                failed += 1
+                futures.append(
+                    (pdf_path, executor.submit(self.upload_one, pdf_path))
+                )
         
-        self.logger.info(f"reMarkable upload summary: {uploaded} uploaded, {skipped} skipped, {failed} failed")
-        return {'uploaded': uploaded, 'failed': failed, 'skipped': skipped}
+        for pdf_path, future in futures:
+            outcome = future.result()
+            results[outcome] += 1
+            if on_result:
+                on_result(pdf_path, outcome != 'failed')
+        
+        if ready is not None:
+            self.logger.info(
+                f"reMarkable upload summary: {results['uploaded']} uploaded, "
+                f"{results['skipped']} skipped, {results['failed']} failed"
+            )
+        return results
     
     def list_remarkable_files(self) -> Optional[str]:
         """List files in the reMarkable folder for debugging"""
@@ -251,12 +478,7 @@ class RemarkableUploader:
             return None
             
         try:
-            result = subprocess.run(
-                [self.rmapi_path, 'ls', self.folder_name],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            result = self._run(['ls', self.folder_name], timeout=30)
             
             if result.returncode == 0:
                 return result.stdout
@@ -0,0 +1,24 @@
+"""Shared fixtures for the test suite"""
+
+import pytest
+from feedparser import FeedParserDict
+
+
+@pytest.fixture
+def make_entry():
+    """Build a feedparser-style entry; content may be given as a plain string"""
+    def factory(**fields):
+        if isinstance(fields.get("content"), str):
+            fields["content"] = [FeedParserDict(value=fields["content"])]
+        return FeedParserDict(**fields)
+    return factory
+
+
+@pytest.fixture
+def make_feed():
+    """Build a feedparser-style parse result holding the given entries"""
+    def factory(*entries, title="Test Feed"):
+        return FeedParserDict(
+            feed=FeedParserDict(title=title), entries=list(entries), bozo=False
+        )
+    return factory
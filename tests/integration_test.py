@@ -12,9 +12,12 @@ Run locally with: python tests/integration_test.py
 
 import os
 import sys
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 
+from feedparser import FeedParserDict
+
 from main import AtomFeedProcessor
 from config import Config
 from remarkable import RemarkableUploader
@@ -60,19 +63,21 @@ def test_recent_filtering():
     """Test the recent entry filtering"""
     processor = AtomFeedProcessor()
     
-    # Create a mock entry
-    class MockEntry:
-        def __init__(self, published_time):
-            self.published = published_time.strftime('%a, %d %b %Y %H:%M:%S GMT')
-            self.title = "Test Entry"
+    # Build entries the way feedparser returns them
+    def make_entry(published_time):
+        return FeedParserDict(
+            published_parsed=time.gmtime(published_time.timestamp()),
+            published=published_time.strftime('%a, %d %b %Y %H:%M:%S GMT'),
+            title="Test Entry",
+        )
     
     # Test recent entry (1 hour ago)
-    recent_entry = MockEntry(datetime.now() - timedelta(hours=1))
+    recent_entry = make_entry(datetime.now() - timedelta(hours=1))
     is_recent, date = processor.is_entry_recent(recent_entry)
     print(f"Entry from 1 hour ago - Recent: {is_recent}")
     
     # Test old entry (48 hours ago)
-    old_entry = MockEntry(datetime.now() - timedelta(hours=48))
+    old_entry = make_entry(datetime.now() - timedelta(hours=48))
     is_recent, date = processor.is_entry_recent(old_entry)
     print(f"Entry from 48 hours ago - Recent: {is_recent}")
     
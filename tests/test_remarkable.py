@@ -1,195 +1,306 @@
 """Tests for RemarkableUploader"""
 
+import queue
+import subprocess
+import threading
 import pytest
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
-from remarkable import RemarkableUploader
+from remarkable import RemarkableUploader, RemoteIndex
+
+
+def completed(returncode=0, stdout="", stderr=""):
+    """Build the result subprocess.run would return for an rmapi call"""
+    return subprocess.CompletedProcess(["rmapi"], returncode, stdout=stdout, stderr=stderr)
+
+
+VERSION_OK = completed(stdout="v0.0.32")
+EMPTY_OK = completed()
+NOT_FOUND = completed(returncode=1)
+RMAPI_ERROR = completed(returncode=1, stderr="error")
+
+# (find, mkdir) results for ensure_folder_exists when the folder is missing
+MKDIR_CREATED = (NOT_FOUND, EMPTY_OK)
+MKDIR_ALREADY_EXISTS = (NOT_FOUND, completed(returncode=1, stderr="already exists"))
+MKDIR_DENIED = (NOT_FOUND, completed(returncode=1, stderr="permission denied"))
+
+ARTICLE_PDF = Path("output/Feed/article.pdf")
+ARTICLE2_PDF = Path("output/Feed/article2.pdf")
+MY_FEED_PDF = Path("output/My Feed/article.pdf")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def rmapi_config(module_mocker):
+    # Pin the settings once for this module; a session-scoped patch would
+    # stay in place for every test module that runs after this one
+    module_mocker.patch("config.Config.RMAPI_PATH", "rmapi")
+    module_mocker.patch("config.Config.REMARKABLE_FOLDER", "AtomFeeds")
 
 
 @pytest.fixture
-def uploader(mocker):
-    mocker.patch("config.Config.RMAPI_PATH", "rmapi")
-    mocker.patch("config.Config.REMARKABLE_FOLDER", "AtomFeeds")
+def uploader():
+    return RemarkableUploader()
+
+
+@pytest.fixture(scope="class")
+def shared_uploader():
+    """One uploader per class, for tests that never touch its caches"""
     return RemarkableUploader()
 
 
 class TestCheckRmapiAvailable:
-    def test_returns_true_when_rmapi_works(self, uploader, mocker):
+    @pytest.mark.parametrize("outcome, expected", [
+        ({"return_value": VERSION_OK}, True),
+        ({"return_value": RMAPI_ERROR}, False),
+        ({"side_effect": FileNotFoundError}, False),
+    ], ids=["works", "fails", "not-found"])
+    def test_reports_availability(self, uploader, outcome, expected):
+        with patch("subprocess.run", **outcome):
+            assert uploader.check_rmapi_available() is expected
+
+    def test_caches_success(self, uploader, mocker):
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=0, stdout="v0.0.32", stderr="")
+        mock_run.return_value = VERSION_OK
+        assert uploader.check_rmapi_available() is True
         assert uploader.check_rmapi_available() is True
+        mock_run.assert_called_once()
 
-    def test_returns_false_when_rmapi_fails(self, uploader, mocker):
+    def test_force_rechecks(self, uploader, mocker):
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=1, stdout="", stderr="error")
+        mock_run.return_value = VERSION_OK
+        uploader.check_rmapi_available()
+        mock_run.return_value = RMAPI_ERROR
+        assert uploader.check_rmapi_available(force=True) is False
         assert uploader.check_rmapi_available() is False
+        assert mock_run.call_count == 3
 
-    def test_returns_false_when_rmapi_not_found(self, uploader, mocker):
-        mocker.patch("subprocess.run", side_effect=FileNotFoundError)
+    def test_retries_after_failure(self, uploader, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = RMAPI_ERROR
         assert uploader.check_rmapi_available() is False
+        mock_run.return_value = VERSION_OK
+        assert uploader.check_rmapi_available() is True
 
-    def test_returns_false_on_timeout(self, uploader, mocker):
-        import subprocess
-        mocker.patch("subprocess.run", side_effect=subprocess.TimeoutExpired("rmapi", 30))
-        assert uploader.check_rmapi_available() is False
+
+@pytest.mark.parametrize("method, args, stubbed", [
+    ("check_rmapi_available", (), ()),
+    ("ensure_folder_exists", (), ()),
+    ("ensure_subfolder_exists", ("AtomFeeds/My Feed",), ()),
+    ("upload_pdf", (ARTICLE_PDF, "Feed"),
+     ("ensure_folder_exists", "ensure_subfolder_exists")),
+])
+def test_returns_false_on_timeout(uploader, mocker, method, args, stubbed):
+    for name in stubbed:
+        mocker.patch.object(uploader, name, return_value=True)
+    mocker.patch("subprocess.run", side_effect=subprocess.TimeoutExpired("rmapi", 30))
+    mocker.patch("time.sleep")
+    assert getattr(uploader, method)(*args) is False
+
+
+class TestRun:
+    def test_closes_stdin_and_captures_text(self, uploader, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        uploader._run(["ls", "AtomFeeds"], timeout=30)
+        mock_run.assert_called_once_with(
+            ["rmapi", "ls", "AtomFeeds"],
+            executable=uploader._rmapi_executable,
+            capture_output=True,
+            text=True,
+            stdin=subprocess.DEVNULL,
+            close_fds=False,
+            timeout=30,
+        )
+
+    def test_resolves_bare_name_on_path(self, mocker):
+        mocker.patch("config.Config.RMAPI_PATH", "rmapi")
+        mocker.patch("shutil.which", return_value="/usr/local/bin/rmapi")
+        assert RemarkableUploader()._rmapi_executable == "/usr/local/bin/rmapi"
+
+    def test_keeps_configured_path_when_not_found(self, mocker):
+        mocker.patch("config.Config.RMAPI_PATH", "rmapi")
+        mocker.patch("shutil.which", return_value=None)
+        assert RemarkableUploader()._rmapi_executable == "rmapi"
 
 
 class TestGetRemarkableFilePath:
-    def test_path_with_subfolder(self, uploader):
+    def test_path_with_subfolder(self, shared_uploader):
         pdf = Path("output/My Feed/07-28-2025 Article.pdf")
-        result = uploader.get_remarkable_file_path(pdf, "My Feed")
+        result = shared_uploader.get_remarkable_file_path(pdf, "My Feed")
         assert result == "AtomFeeds/My Feed/07-28-2025 Article"
 
-    def test_path_without_subfolder(self, uploader):
+    def test_path_without_subfolder(self, shared_uploader):
         pdf = Path("output/07-28-2025 Article.pdf")
-        result = uploader.get_remarkable_file_path(pdf)
+        result = shared_uploader.get_remarkable_file_path(pdf)
         assert result == "AtomFeeds/07-28-2025 Article"
 
-    def test_strips_pdf_extension(self, uploader):
-        pdf = Path("output/My Feed/article.pdf")
-        result = uploader.get_remarkable_file_path(pdf, "My Feed")
+    def test_strips_pdf_extension(self, shared_uploader):
+        pdf = MY_FEED_PDF
+        result = shared_uploader.get_remarkable_file_path(pdf, "My Feed")
         assert not result.endswith(".pdf")
 
 
 class TestFileExistsInRemarkable:
-    def test_returns_true_when_file_found(self, uploader, mocker):
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=0, stdout="AtomFeeds/article")
-        assert uploader.file_exists_in_remarkable("AtomFeeds/article") is True
-
-    def test_returns_false_when_file_not_found(self, uploader, mocker):
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=1, stdout="")
-        assert uploader.file_exists_in_remarkable("AtomFeeds/article") is False
-
-    def test_returns_false_on_empty_output(self, uploader, mocker):
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=0, stdout="")
-        assert uploader.file_exists_in_remarkable("AtomFeeds/article") is False
+    @pytest.mark.parametrize("result, expected", [
+        (completed(stdout="AtomFeeds/article"), True),
+        (NOT_FOUND, False),
+        (EMPTY_OK, False),
+    ], ids=["found", "not-found", "empty-output"])
+    def test_reports_find_result(self, shared_uploader, result, expected):
+        with patch("subprocess.run", return_value=result):
+            assert shared_uploader.file_exists_in_remarkable("AtomFeeds/article") is expected
 
 
 class TestUploadPdfs:
-    def test_skips_all_when_rmapi_unavailable(self, uploader, mocker):
-        mocker.patch.object(uploader, "check_rmapi_available", return_value=False)
-        pdfs = [Path("output/Feed/article.pdf")]
+    @pytest.fixture(autouse=True)
+    def no_remote_index(self, uploader, mocker):
+        # Fall back to per-file find, which these tests mock
+        mocker.patch.object(uploader, "_load_remote_index", return_value=None)
+
+    @pytest.fixture
+    def upload_ctx(self, uploader, mocker):
+        """Patch the uploader so every PDF is new and uploads succeed"""
+        return SimpleNamespace(
+            check=mocker.patch.object(uploader, "check_rmapi_available", return_value=True),
+            folder=mocker.patch.object(uploader, "ensure_folder_exists", return_value=True),
+            exists=mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False),
+            upload=mocker.patch.object(uploader, "upload_pdf", return_value=True),
+        )
+
+    def test_skips_all_when_rmapi_unavailable(self, uploader, upload_ctx):
+        upload_ctx.check.return_value = False
+        pdfs = [ARTICLE_PDF]
         result = uploader.upload_pdfs(pdfs)
         assert result == {"uploaded": 0, "failed": 0, "skipped": 1}
 
-    def test_skips_existing_files(self, uploader, mocker):
-        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
-        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
-        mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=True)
-        pdfs = [Path("output/Feed/article.pdf")]
+    def test_empty_batch_does_not_touch_rmapi(self, uploader, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        assert uploader.upload_pdfs([]) == {"uploaded": 0, "failed": 0, "skipped": 0}
+        mock_run.assert_not_called()
+
+    def test_skips_existing_files(self, uploader, upload_ctx):
+        upload_ctx.exists.return_value = True
+        pdfs = [ARTICLE_PDF]
         result = uploader.upload_pdfs(pdfs)
         assert result["skipped"] == 1
         assert result["uploaded"] == 0
+        upload_ctx.upload.assert_not_called()
 
-    def test_counts_successful_uploads(self, uploader, mocker):
-        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
-        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
-        mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
-        mocker.patch.object(uploader, "upload_pdf", return_value=True)
-        pdfs = [Path("output/Feed/article.pdf"), Path("output/Feed/article2.pdf")]
+    def test_counts_successful_uploads(self, uploader, upload_ctx):
+        pdfs = [ARTICLE_PDF, ARTICLE2_PDF]
         result = uploader.upload_pdfs(pdfs)
         assert result["uploaded"] == 2
         assert result["failed"] == 0
 
-    def test_counts_failed_uploads(self, uploader, mocker):
-        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
-        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
-        mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
-        mocker.patch.object(uploader, "upload_pdf", return_value=False)
-        pdfs = [Path("output/Feed/article.pdf")]
+    def test_counts_failed_uploads(self, uploader, upload_ctx):
+        upload_ctx.upload.return_value = False
+        pdfs = [ARTICLE_PDF]
         result = uploader.upload_pdfs(pdfs)
         assert result["failed"] == 1
         assert result["uploaded"] == 0
 
-    def test_skips_all_when_folder_creation_fails(self, uploader, mocker):
-        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
-        mocker.patch.object(uploader, "ensure_folder_exists", return_value=False)
-        pdfs = [Path("output/Feed/article.pdf"), Path("output/Feed/article2.pdf")]
+    def test_skips_all_when_folder_creation_fails(self, uploader, upload_ctx):
+        upload_ctx.folder.return_value = False
+        pdfs = [ARTICLE_PDF, ARTICLE2_PDF]
         result = uploader.upload_pdfs(pdfs)
         assert result == {"uploaded": 0, "failed": 0, "skipped": 2}
 
-    def test_extracts_subfolder_from_path(self, uploader, mocker):
-        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
-        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
-        mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
-
-        upload_pdf_mock = mocker.patch.object(uploader, "upload_pdf", return_value=True)
-        pdfs = [Path("output/My Feed/article.pdf")]
+    def test_extracts_subfolder_from_path(self, uploader, upload_ctx):
+        pdfs = [MY_FEED_PDF]
         uploader.upload_pdfs(pdfs)
 
-        upload_pdf_mock.assert_called_once_with(pdfs[0], "My Feed")
+        upload_ctx.upload.assert_called_once_with(pdfs[0], "My Feed")
 
-    def test_handles_exception_per_file(self, uploader, mocker):
-        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
-        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
-        mocker.patch.object(uploader, "file_exists_in_remarkable", side_effect=Exception("boom"))
-        pdfs = [Path("output/Feed/article.pdf")]
+    def test_uploads_files_concurrently(self, uploader, upload_ctx, mocker):
+        mocker.patch("config.Config.UPLOAD_CONCURRENCY", 2)
+        # Both uploads must be in flight at once to pass the barrier
+        barrier = threading.Barrier(2, timeout=5)
+
+        def upload_task(pdf_path, feed_subfolder):
+            barrier.wait()
+            return "uploaded"
+
+        mocker.patch.object(uploader, "_upload_task", side_effect=upload_task)
+        pdfs = [Path("output/Feed/a.pdf"), Path("output/Feed/b.pdf")]
+        result = uploader.upload_pdfs(pdfs)
+        assert result == {"uploaded": 2, "failed": 0, "skipped": 0}
+
+    def test_handles_exception_per_file(self, uploader, upload_ctx):
+        upload_ctx.exists.side_effect = Exception("boom")
+        pdfs = [ARTICLE_PDF]
         result = uploader.upload_pdfs(pdfs)
         assert result["failed"] == 1
 
 
 class TestEnsureFolderExists:
-    def test_returns_true_when_folder_found(self, uploader, mocker):
-        mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=0, stdout="AtomFeeds\n")
-        assert uploader.ensure_folder_exists() is True
+    def test_returns_true_when_folder_found(self, uploader):
+        with patch("subprocess.run", return_value=completed(stdout="AtomFeeds\n")):
+            assert uploader.ensure_folder_exists() is True
 
-    def test_creates_folder_when_not_found(self, uploader, mocker):
-        find_result = MagicMock(returncode=1, stdout="")
-        mkdir_result = MagicMock(returncode=0, stdout="")
-        mocker.patch("subprocess.run", side_effect=[find_result, mkdir_result])
-        assert uploader.ensure_folder_exists() is True
+    def test_creates_folder_when_not_found(self, uploader):
+        with patch("subprocess.run", side_effect=MKDIR_CREATED):
+            assert uploader.ensure_folder_exists() is True
+
+    def test_returns_true_when_mkdir_says_already_exists(self, uploader):
+        with patch("subprocess.run", side_effect=MKDIR_ALREADY_EXISTS):
+            assert uploader.ensure_folder_exists() is True
+
+    def test_returns_false_when_mkdir_fails(self, uploader):
+        with patch("subprocess.run", side_effect=MKDIR_DENIED):
+            assert uploader.ensure_folder_exists() is False
 
-    def test_returns_true_when_mkdir_says_already_exists(self, uploader, mocker):
-        find_result = MagicMock(returncode=1, stdout="")
-        mkdir_result = MagicMock(returncode=1, stderr="already exists")
-        mocker.patch("subprocess.run", side_effect=[find_result, mkdir_result])
+    def test_checks_folder_once(self, uploader, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = completed(stdout="AtomFeeds")
+        assert uploader.ensure_folder_exists() is True
         assert uploader.ensure_folder_exists() is True
+        mock_run.assert_called_once()
 
-    def test_returns_false_when_mkdir_fails(self, uploader, mocker):
-        find_result = MagicMock(returncode=1, stdout="")
-        mkdir_result = MagicMock(returncode=1, stderr="permission denied")
-        mocker.patch("subprocess.run", side_effect=[find_result, mkdir_result])
+    def test_rechecks_after_failure(self, uploader, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = completed(returncode=1, stderr="network error")
         assert uploader.ensure_folder_exists() is False
-
-    def test_returns_false_on_timeout(self, uploader, mocker):
-        import subprocess
-        mocker.patch("subprocess.run", side_effect=subprocess.TimeoutExpired("rmapi", 30))
         assert uploader.ensure_folder_exists() is False
+        assert mock_run.call_count == 4
 
 
 class TestEnsureSubfolderExists:
-    def test_returns_true_when_subfolder_found(self, uploader, mocker):
+    def test_returns_true_when_mkdir_says_already_exists(self, uploader):
+        already = completed(returncode=1, stderr="Error: entry already exists")
+        with patch("subprocess.run", return_value=already):
+            assert uploader.ensure_subfolder_exists("AtomFeeds/My Feed") is True
+
+    def test_creates_subfolder_without_find(self, uploader, mocker):
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=0, stdout="AtomFeeds/My Feed\n")
+        mock_run.return_value = EMPTY_OK
         assert uploader.ensure_subfolder_exists("AtomFeeds/My Feed") is True
+        mock_run.assert_called_once()
+        assert mock_run.call_args.args[0] == ["rmapi", "mkdir", "AtomFeeds/My Feed"]
 
-    def test_creates_subfolder_when_not_found(self, uploader, mocker):
-        find_result = MagicMock(returncode=1, stdout="")
-        mkdir_result = MagicMock(returncode=0, stdout="")
-        mocker.patch("subprocess.run", side_effect=[find_result, mkdir_result])
-        assert uploader.ensure_subfolder_exists("AtomFeeds/My Feed") is True
+    def test_returns_false_when_mkdir_fails(self, uploader):
+        with patch("subprocess.run", return_value=RMAPI_ERROR):
+            assert uploader.ensure_subfolder_exists("AtomFeeds/My Feed") is False
 
-    def test_returns_false_when_mkdir_fails(self, uploader, mocker):
-        find_result = MagicMock(returncode=1, stdout="")
-        mkdir_result = MagicMock(returncode=1, stderr="error")
-        mocker.patch("subprocess.run", side_effect=[find_result, mkdir_result])
-        assert uploader.ensure_subfolder_exists("AtomFeeds/My Feed") is False
+    def test_checks_subfolder_once(self, uploader, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = EMPTY_OK
+        assert uploader.ensure_subfolder_exists("AtomFeeds/Feed") is True
+        assert uploader.ensure_subfolder_exists("AtomFeeds/Feed") is True
+        mock_run.assert_called_once()
 
-    def test_returns_false_on_timeout(self, uploader, mocker):
-        import subprocess
-        mocker.patch("subprocess.run", side_effect=subprocess.TimeoutExpired("rmapi", 30))
-        assert uploader.ensure_subfolder_exists("AtomFeeds/My Feed") is False
+    def test_listed_folder_is_known(self, uploader, mocker):
+        mocker.patch.object(uploader, "_load_remote_index", return_value=set())
+        mock_run = mocker.patch("subprocess.run")
+        uploader._remote_names("AtomFeeds/Feed")
+        assert uploader.ensure_subfolder_exists("AtomFeeds/Feed") is True
+        mock_run.assert_not_called()
 
 
 class TestUploadPdf:
     def test_skips_when_file_exists(self, uploader, mocker):
         mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=True)
-        result = uploader.upload_pdf(Path("output/Feed/article.pdf"), "Feed")
+        result = uploader.upload_pdf(ARTICLE_PDF, "Feed")
         assert result is True
 
     def test_uploads_successfully_with_subfolder(self, uploader, mocker):
@@ -197,16 +308,16 @@ class TestUploadPdf:
         mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
         mocker.patch.object(uploader, "ensure_subfolder_exists", return_value=True)
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=0)
+        mock_run.return_value = EMPTY_OK
 
-        result = uploader.upload_pdf(Path("output/Feed/article.pdf"), "Feed")
+        result = uploader.upload_pdf(ARTICLE_PDF, "Feed")
         assert result is True
 
     def test_uploads_successfully_without_subfolder(self, uploader, mocker):
         mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
         mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=0)
+        mock_run.return_value = EMPTY_OK
 
         result = uploader.upload_pdf(Path("output/article.pdf"))
         assert result is True
@@ -215,7 +326,7 @@ class TestUploadPdf:
         mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
         mocker.patch.object(uploader, "ensure_folder_exists", return_value=False)
 
-        result = uploader.upload_pdf(Path("output/Feed/article.pdf"), "Feed")
+        result = uploader.upload_pdf(ARTICLE_PDF, "Feed")
         assert result is False
 
     def test_returns_false_on_upload_failure(self, uploader, mocker):
@@ -223,27 +334,83 @@ class TestUploadPdf:
         mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
         mocker.patch.object(uploader, "ensure_subfolder_exists", return_value=True)
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=1, stderr="upload failed")
+        mock_run.return_value = completed(returncode=1, stderr="upload failed")
 
-        result = uploader.upload_pdf(Path("output/Feed/article.pdf"), "Feed")
+        result = uploader.upload_pdf(ARTICLE_PDF, "Feed")
         assert result is False
 
-    def test_returns_false_on_timeout(self, uploader, mocker):
-        import subprocess
+    def test_retries_transient_failure(self, uploader, mocker):
+        mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        mocker.patch.object(uploader, "ensure_subfolder_exists", return_value=True)
+        mock_run = mocker.patch("subprocess.run", side_effect=[
+            completed(returncode=1, stderr="Error: connection reset by peer"),
+            EMPTY_OK,
+        ])
+        sleep = mocker.patch("time.sleep")
+
+        result = uploader.upload_pdf(ARTICLE_PDF, "Feed")
+        assert result is True
+        assert mock_run.call_count == 2
+        sleep.assert_called_once_with(1)
+
+    def test_gives_up_after_configured_attempts(self, uploader, mocker):
+        mocker.patch("config.Config.UPLOAD_ATTEMPTS", 3)
         mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
         mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
         mocker.patch.object(uploader, "ensure_subfolder_exists", return_value=True)
-        mocker.patch("subprocess.run", side_effect=subprocess.TimeoutExpired("rmapi", 120))
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = completed(returncode=1, stderr="503 Service Unavailable")
+        sleep = mocker.patch("time.sleep")
 
-        result = uploader.upload_pdf(Path("output/Feed/article.pdf"), "Feed")
+        result = uploader.upload_pdf(ARTICLE_PDF, "Feed")
         assert result is False
+        assert mock_run.call_count == 3
+        assert [call.args[0] for call in sleep.call_args_list] == [1, 2]
+
+    def test_does_not_retry_permanent_failure(self, uploader, mocker):
+        mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        mocker.patch.object(uploader, "ensure_subfolder_exists", return_value=True)
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = completed(returncode=1, stderr="invalid pdf")
+        sleep = mocker.patch("time.sleep")
+
+        assert uploader.upload_pdf(ARTICLE_PDF, "Feed") is False
+        mock_run.assert_called_once()
+        sleep.assert_not_called()
+
+    def test_does_not_retry_put_after_timeout(self, uploader, mocker):
+        mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        mocker.patch.object(uploader, "ensure_subfolder_exists", return_value=True)
+        mock_run = mocker.patch("subprocess.run", side_effect=[
+            subprocess.TimeoutExpired("rmapi", 120),
+            EMPTY_OK,
+        ])
+        mocker.patch("time.sleep")
+
+        assert uploader.upload_pdf(ARTICLE_PDF, "Feed") is False
+        assert [call.args[0][1] for call in mock_run.call_args_list] == ["put", "ls"]
+
+    def test_timed_out_put_that_arrived_counts_as_uploaded(self, uploader, mocker):
+        mocker.patch.object(uploader, "file_exists_in_remarkable", return_value=False)
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        mocker.patch.object(uploader, "ensure_subfolder_exists", return_value=True)
+        mock_run = mocker.patch("subprocess.run", side_effect=[
+            subprocess.TimeoutExpired("rmapi", 120),
+            completed(stdout=f"[f]\t{ARTICLE_PDF.stem}\n"),
+        ])
+
+        assert uploader.upload_pdf(ARTICLE_PDF, "Feed") is True
+        assert mock_run.call_count == 2
 
 
 class TestListRemarkableFiles:
     def test_returns_file_list_on_success(self, uploader, mocker):
         mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=0, stdout="file1\nfile2\n")
+        mock_run.return_value = completed(stdout="file1\nfile2\n")
 
         result = uploader.list_remarkable_files()
         assert result == "file1\nfile2\n"
@@ -255,6 +422,158 @@ class TestListRemarkableFiles:
     def test_returns_none_on_failure(self, uploader, mocker):
         mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
         mock_run = mocker.patch("subprocess.run")
-        mock_run.return_value = MagicMock(returncode=1, stderr="error")
+        mock_run.return_value = RMAPI_ERROR
 
         assert uploader.list_remarkable_files() is None
+
+
+class TestUploadStream:
+    def _queue(self, *items):
+        pdf_queue = queue.Queue()
+        for item in items:
+            pdf_queue.put(item)
+        pdf_queue.put(None)
+        return pdf_queue
+
+    def test_uploads_until_sentinel(self, uploader, mocker):
+        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        mocker.patch.object(uploader, "upload_one", side_effect=["uploaded", "skipped"])
+
+        pdfs = [Path("output/Feed/a.pdf"), Path("output/Feed/b.pdf")]
+        result = uploader.upload_stream(self._queue(*pdfs))
+        assert result == {"uploaded": 1, "failed": 0, "skipped": 1}
+
+    def test_checks_rmapi_once(self, uploader, mocker):
+        check = mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        mocker.patch.object(uploader, "upload_one", return_value="uploaded")
+
+        uploader.upload_stream(self._queue(Path("output/Feed/a.pdf"), Path("output/Feed/b.pdf")))
+        check.assert_called_once()
+
+    def test_skips_all_when_rmapi_unavailable(self, uploader, mocker):
+        mocker.patch.object(uploader, "check_rmapi_available", return_value=False)
+        upload_one = mocker.patch.object(uploader, "upload_one")
+
+        result = uploader.upload_stream(self._queue(Path("output/Feed/a.pdf"), Path("output/Feed/b.pdf")))
+        assert result == {"uploaded": 0, "failed": 0, "skipped": 2}
+        upload_one.assert_not_called()
+
+    def test_reports_each_result(self, uploader, mocker):
+        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        mocker.patch.object(uploader, "upload_one", side_effect=["uploaded", "skipped", "failed"])
+        pdfs = [Path("output/Feed/a.pdf"), Path("output/Feed/b.pdf"), Path("output/Feed/c.pdf")]
+        reported = []
+
+        uploader.upload_stream(self._queue(*pdfs), on_result=lambda *r: reported.append(r))
+        assert reported == [(pdfs[0], True), (pdfs[1], True), (pdfs[2], False)]
+
+    def test_reports_unavailable_rmapi_as_not_uploaded(self, uploader, mocker):
+        mocker.patch.object(uploader, "check_rmapi_available", return_value=False)
+        reported = []
+
+        uploader.upload_stream(self._queue(ARTICLE_PDF), on_result=lambda *r: reported.append(r))
+        assert reported == [(ARTICLE_PDF, False)]
+
+    def test_empty_queue_does_not_touch_rmapi(self, uploader, mocker):
+        check = mocker.patch.object(uploader, "check_rmapi_available")
+        result = uploader.upload_stream(self._queue())
+        assert result == {"uploaded": 0, "failed": 0, "skipped": 0}
+        check.assert_not_called()
+
+
+class TestPlanUploads:
+    def test_pairs_pdfs_with_subfolders(self, uploader):
+        pdfs = [
+            Path("output/Feed A/a.pdf"),
+            Path("output/Feed A/b.pdf"),
+            Path("output/Feed B/c.pdf"),
+        ]
+        tasks, folders = uploader._plan_uploads(pdfs)
+        assert tasks == [(pdfs[0], "Feed A"), (pdfs[1], "Feed A"), (pdfs[2], "Feed B")]
+        assert folders == {"AtomFeeds/Feed A", "AtomFeeds/Feed B"}
+
+    def test_top_level_pdf_targets_main_folder(self, uploader):
+        tasks, folders = uploader._plan_uploads([Path("elsewhere/a.pdf")])
+        assert tasks == [(Path("elsewhere/a.pdf"), None)]
+        assert folders == {"AtomFeeds"}
+
+    def test_upload_pdfs_lists_each_folder_once(self, uploader, mocker):
+        mocker.patch.object(uploader, "check_rmapi_available", return_value=True)
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        load = mocker.patch.object(uploader, "_load_remote_index", return_value={"a", "b", "c"})
+        pdfs = [Path("output/Feed A/a.pdf"), Path("output/Feed A/b.pdf"), Path("output/Feed B/c.pdf")]
+
+        result = uploader.upload_pdfs(pdfs)
+        assert result == {"uploaded": 0, "failed": 0, "skipped": 3}
+        assert sorted(call.args[0] for call in load.call_args_list) == [
+            "AtomFeeds/Feed A", "AtomFeeds/Feed B"
+        ]
+
+
+class TestRemoteIndex:
+    LS_OUTPUT = "[d]\tMy Feed\n[f]\t07-28-2025 Article\n[f]\tOther Doc\n"
+
+    def test_parses_document_names(self, uploader, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = completed(stdout=self.LS_OUTPUT)
+        names = uploader._load_remote_index("AtomFeeds")
+        assert names == {"07-28-2025 Article", "Other Doc"}
+        assert mock_run.call_args.args[0] == ["rmapi", "ls", "AtomFeeds"]
+
+    def test_returns_none_when_listing_fails(self, uploader, mocker):
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = completed(returncode=1, stderr="not found")
+        assert uploader._load_remote_index("AtomFeeds/Missing") is None
+
+    def test_lists_each_folder_once(self, uploader, mocker):
+        load = mocker.patch.object(uploader, "_load_remote_index", return_value={"a"})
+        find = mocker.patch.object(uploader, "file_exists_in_remarkable")
+
+        for name in ("a", "a"):
+            assert uploader.upload_one(Path(f"output/Feed/{name}.pdf")) == "skipped"
+        load.assert_called_once_with("AtomFeeds/Feed")
+        find.assert_not_called()
+
+    def test_uploaded_file_is_added_to_index(self, uploader, mocker):
+        mocker.patch.object(uploader, "_load_remote_index", return_value=set())
+        mocker.patch.object(uploader, "ensure_folder_exists", return_value=True)
+        mocker.patch.object(uploader, "ensure_subfolder_exists", return_value=True)
+        mock_run = mocker.patch("subprocess.run")
+        mock_run.return_value = EMPTY_OK
+
+        assert uploader.upload_one(Path("output/Feed/new.pdf")) == "uploaded"
+        assert uploader.index.cached("AtomFeeds/Feed") == {"new"}
+        assert uploader.upload_one(Path("output/Feed/new.pdf")) == "skipped"
+
+
+class TestRemoteIndexCache:
+    def test_lists_folder_once_within_ttl(self):
+        lister = MagicMock(return_value={"a"})
+        index = RemoteIndex(lister)
+        assert index.contains("AtomFeeds", "a") is True
+        assert index.contains("AtomFeeds", "b") is False
+        lister.assert_called_once_with("AtomFeeds")
+
+    def test_relists_after_ttl(self, mocker):
+        lister = MagicMock(side_effect=[{"a"}, {"a", "b"}])
+        clock = mocker.patch("time.monotonic", return_value=100.0)
+        index = RemoteIndex(lister, ttl=60)
+        assert index.contains("AtomFeeds", "b") is False
+        clock.return_value = 161.0
+        assert index.contains("AtomFeeds", "b") is True
+        assert lister.call_count == 2
+
+    def test_unlistable_folder_is_unknown(self):
+        index = RemoteIndex(MagicMock(return_value=None))
+        assert index.contains("AtomFeeds", "a") is None
+
+    def test_add_only_updates_listed_folders(self):
+        index = RemoteIndex(MagicMock(return_value=set()))
+        index.add("AtomFeeds", "a")
+        assert index.cached("AtomFeeds") is None
+        index.names("AtomFeeds")
+        index.add("AtomFeeds", "a")
+        assert index.cached("AtomFeeds") == {"a"}